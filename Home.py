@@ -1,115 +1,146 @@
 ﻿import streamlit as st
-import base64
 from pathlib import Path
+from string import Template
 import os
 os.environ.setdefault("ASHA_APP_PASSWORD", "CliniIQ@ITC")  # or set in your environment / secrets
 from auth_gate import check_password
-check_password()
-
-
+from PIL import Image
+from ui.static_files import STATIC_DIR, publish, static_url
 
+# Must be the first Streamlit call on the page
 st.set_page_config(page_title="Clinic Assistant", page_icon="🤖", layout="wide")
 
+# Gate before any background/CSS work so password keystrokes rerun a near-empty script
+if not check_password():
+    st.stop()
+
 # ---------- Background helper ----------
+BG_MAX_SIZE = (1920, 1080)  # the largest the background is ever rendered
+
+@st.cache_resource(show_spinner=False)
+def _published_bg(path: str, mtime: float) -> str:
+    # Re-encoded once per image version as a display-sized WebP (PNG is several
+    # times larger); the browser then caches the static URL
+    try:
+        with Image.open(path) as im:
+            im = im.convert("RGB")
+            im.thumbnail(BG_MAX_SIZE)
+            STATIC_DIR.mkdir(parents=True, exist_ok=True)
+            im.save(STATIC_DIR / "bg.webp", "WEBP", quality=80, method=6)
+        return static_url("bg.webp")
+    except Exception:
+        # Pillow built without WebP: serve the original file
+        return publish(path, "bg" + Path(path).suffix.lower())
+
+# Page CSS; only the background URL varies, so it is substituted into a fixed template
+_BG_CSS = Template("""
+    <style>
+    .stApp {
+        background-image: url("$bg_url");
+        background-size: cover;
+        background-position: center;
+        background-repeat: no-repeat;
+    }
+
+    /* Glass card for main container */
+    .block-container {
+        background: rgba(255,255,255,0.78);
+        backdrop-filter: blur(6px);
+        -webkit-backdrop-filter: blur(6px);
+        border-radius: 18px;
+        padding: 2.2rem 2.4rem;
+        box-shadow: 0 10px 40px rgba(0,0,0,0.12);
+    }
+
+    /* Header transparent */
+    [data-testid="stHeader"] { background: transparent; }
+
+    /* Gradient headline */
+    .hero-title {
+        font-size: clamp(2rem, 3.2vw, 3.4rem);
+        font-weight: 800;
+        line-height: 1.05;
+        letter-spacing: -0.02em;
+        background: linear-gradient(92deg, #0ea5e9 0%, #22c55e 50%, #f59e0b 100%);
+        -webkit-background-clip: text;
+        background-clip: text;
+        color: transparent;
+        text-shadow: 0 1px 0 rgba(255,255,255,0.35);
+        margin: 0 0 .25rem 0;
+    }
+
+    /* Animated subtitle */
+    @keyframes fadeUp {
+        from { opacity: 0; transform: translateY(6px); }
+        to   { opacity: 1; transform: translateY(0); }
+    }
+    .hero-sub {
+        font-size: clamp(1rem, 1.2vw, 1.25rem);
+        color: #0f172a;
+        opacity: 0.95;
+        animation: fadeUp .6s ease both .05s;
+        margin-bottom: 1.2rem;
+    }
+
+    /* Feature cards */
+    .cards-row {
+        display: flex;
+        flex-wrap: wrap;
+        gap: 1rem;
+    }
+    .cards-row .card {
+        flex: 1 1 0;
+        min-width: 220px;
+    }
+    .card {
+        background: rgba(255,255,255,0.86);
+        border: 1px solid rgba(15,23,42,0.06);
+        border-radius: 16px;
+        padding: 1.1rem 1.2rem;
+        box-shadow: 0 6px 24px rgba(0,0,0,0.08);
+        height: 100%;
+    }
+    .card h4 {
+        margin: 0 0 .25rem 0;
+        font-size: 1.05rem;
+    }
+    .chip {
+        display: inline-block;
+        padding: .25rem .55rem;
+        border-radius: 999px;
+        background: rgba(14,165,233,0.12);
+        border: 1px solid rgba(14,165,233,0.25);
+        font-size: .78rem;
+        margin-right: .35rem;
+    }
+
+    /* Prettier page_link buttons */
+    a[data-testid="stPageLink"] div[role="button"] {
+        border-radius: 999px;
+        padding: .6rem 1rem;
+        font-weight: 700;
+        box-shadow: 0 8px 22px rgba(2,132,199,0.22);
+    }
+
+    /* Small helper text */
+    .muted {
+        color:#334155; opacity:.9; font-size:.95rem;
+    }
+    </style>
+    """)
+
 def set_background(image_path: str):
     p = Path(image_path)
     if not p.exists():
         st.warning(f"Background image not found: {image_path}")
         return
-    b64 = base64.b64encode(p.read_bytes()).decode()
-    st.markdown(
-        f"""
-        <style>
-        .stApp {{
-            background-image: url("data:image/jpeg;base64,{b64}");
-            background-size: cover;
-            background-position: center;
-            background-repeat: no-repeat;
-        }}
-
-        /* Glass card for main container */
-        .block-container {{
-            background: rgba(255,255,255,0.78);
-            backdrop-filter: blur(6px);
-            -webkit-backdrop-filter: blur(6px);
-            border-radius: 18px;
-            padding: 2.2rem 2.4rem;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.12);
-        }}
-
-        /* Header transparent */
-        [data-testid="stHeader"] {{ background: transparent; }}
-
-        /* Gradient headline */
-        .hero-title {{
-            font-size: clamp(2rem, 3.2vw, 3.4rem);
-            font-weight: 800;
-            line-height: 1.05;
-            letter-spacing: -0.02em;
-            background: linear-gradient(92deg, #0ea5e9 0%, #22c55e 50%, #f59e0b 100%);
-            -webkit-background-clip: text;
-            background-clip: text;
-            color: transparent;
-            text-shadow: 0 1px 0 rgba(255,255,255,0.35);
-            margin: 0 0 .25rem 0;
-        }}
-
-        /* Animated subtitle */
-        @keyframes fadeUp {{
-            from {{ opacity: 0; transform: translateY(6px); }}
-            to   {{ opacity: 1; transform: translateY(0); }}
-        }}
-        .hero-sub {{
-            font-size: clamp(1rem, 1.2vw, 1.25rem);
-            color: #0f172a;
-            opacity: 0.95;
-            animation: fadeUp .6s ease both .05s;
-            margin-bottom: 1.2rem;
-        }}
-
-        /* Feature cards */
-        .card {{
-            background: rgba(255,255,255,0.86);
-            border: 1px solid rgba(15,23,42,0.06);
-            border-radius: 16px;
-            padding: 1.1rem 1.2rem;
-            box-shadow: 0 6px 24px rgba(0,0,0,0.08);
-            height: 100%;
-        }}
-        .card h4 {{
-            margin: 0 0 .25rem 0;
-            font-size: 1.05rem;
-        }}
-        .chip {{
-            display: inline-block;
-            padding: .25rem .55rem;
-            border-radius: 999px;
-            background: rgba(14,165,233,0.12);
-            border: 1px solid rgba(14,165,233,0.25);
-            font-size: .78rem;
-            margin-right: .35rem;
-        }}
-
-        /* Prettier page_link buttons */
-        a[data-testid="stPageLink"] div[role="button"] {{
-            border-radius: 999px;
-            padding: .6rem 1rem;
-            font-weight: 700;
-            box-shadow: 0 8px 22px rgba(2,132,199,0.22);
-        }}
-
-        /* Small helper text */
-        .muted {{
-            color:#334155; opacity:.9; font-size:.95rem;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    bg_url = _published_bg(str(p), p.stat().st_mtime)
+    st.markdown(_BG_CSS.substitute(bg_url=bg_url), unsafe_allow_html=True)
 
 # Set the background image (uploaded to /mnt/data/ai-chatbot.jpg)
 #set_background("C:\\Users\\User\\OneDrive\\Documents\\Agentic_AI_Project\\ai-chatbot.jpg")
-set_background("C:\\Users\\kruna\\training\\Projects\\Project 3\\AshaAgent\\conversational-ai.png")
+#set_background("C:\\Users\\kruna\\training\\Projects\\Project 3\\AshaAgent\\conversational-ai.png")
+set_background(str(Path(__file__).parent / "conversational-ai.png"))
 #st.title("Asha Fertility Clinic Assistant")
 
 # ---------- Hero ----------
@@ -134,37 +165,29 @@ with colC:
 st.markdown("")
 
 # ---------- Feature cards ----------
-c1, c2, c3 = st.columns(3)
-with c1:
-    st.markdown(
-        """
-        <div class="card">
-          <h4>Precision Answers</h4>
-          <p class="muted">Hybrid RAG + OpenAI for context-aware responses.</p>
-          <span class="chip">RAG</span><span class="chip">Context Memory</span>
-        </div>
-        """, unsafe_allow_html=True
-    )
-with c2:
-    st.markdown(
-        """
-        <div class="card">
-          <h4>Embryology Updates</h4>
-          <p class="muted">Auto-generated daily summaries with links &amp; visual cues for patients.</p>
-          <span class="chip">Secure Links</span>
-        </div>
-        """, unsafe_allow_html=True
-    )
-with c3:
-    st.markdown(
-        """
-        <div class="card">
-          <h4>Document Intelligence</h4>
-          <p class="muted">YOLO + OCR pipeline turns PDFs &amp; images into structured facts.</p>
-          <span class="chip">YOLO</span><span class="chip">OCR</span><span class="chip">Pinecone</span>
-        </div>
-        """, unsafe_allow_html=True
-    )
+# One write for the whole row (a flex container) instead of three columns + three markdowns
+st.markdown(
+    """
+    <div class="cards-row">
+      <div class="card">
+        <h4>Precision Answers</h4>
+        <p class="muted">Hybrid RAG + OpenAI for context-aware responses.</p>
+        <span class="chip">RAG</span><span class="chip">Context Memory</span>
+      </div>
+      <div class="card">
+        <h4>Embryology Updates</h4>
+        <p class="muted">Auto-generated daily summaries with links &amp; visual cues for patients.</p>
+        <span class="chip">Secure Links</span>
+      </div>
+      <div class="card">
+        <h4>Document Intelligence</h4>
+        <p class="muted">YOLO + OCR pipeline turns PDFs &amp; images into structured facts.</p>
+        <span class="chip">YOLO</span><span class="chip">OCR</span><span class="chip">Pinecone</span>
+      </div>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
 
 st.markdown("")
 st.caption("Tip: Use the sidebar to switch pages anytime. Thank you !")
@@ -3,8 +3,11 @@
 from typing import Dict, Any
 from pathlib import Path
 
+from PIL import Image
+
 from pipelines.document_detector import detect_documents
 from storage.registry import register_manifest
+from rag import semantic_cache
 
 # Support either naming style in your project:
 # - upsert_manifest(report_dict, patient_id, doc_tag)
@@ -31,6 +34,26 @@ def _resolve_upsert():
     _UPSERT_MODE = ("none", None)
     return _UPSERT_MODE
 
+# Grid previews: the UI shows these and only links to the full-size page
+THUMB_SIZE = (800, 1200)
+THUMB_QUALITY = 80
+
+def thumbnail_path(annotated_image: str | Path) -> Path:
+    """page_01_annotated.png -> page_01_annotated.thumb.jpg (same folder)."""
+    return Path(annotated_image).with_suffix(".thumb.jpg")
+
+def _write_thumbnails(report: Dict[str, Any]) -> None:
+    for page in report.get("pages", []):
+        ann = page.get("annotated_image")
+        if not ann or not Path(ann).exists():
+            continue
+        thumb = thumbnail_path(ann)
+        with Image.open(ann) as im:
+            im = im.convert("RGB")
+            im.thumbnail(THUMB_SIZE)
+            im.save(str(thumb), "JPEG", quality=THUMB_QUALITY)
+        page["thumbnail"] = str(thumb)
+
 
 def run_extraction(
     file_path: str,
@@ -60,6 +83,11 @@ def run_extraction(
         out_dir=out_dir,
     )
 
+    try:
+        _write_thumbnails(report)
+    except Exception as e:
+        report["thumbnail_error"] = str(e)
+
     # 2) Register manifest path in local registry (for "latest" lookup)
     try:
         register_manifest(str(patient_id), report["manifest"])
@@ -79,4 +107,6 @@ def run_extraction(
     except Exception as e:
         report["pinecone_upsert_error"] = str(e)
 
+    # New manifest/vectors for this patient: cached chat answers are stale
+    semantic_cache.invalidate(patient_id=str(patient_id))
     return report
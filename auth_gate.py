@@ -1,20 +1,62 @@
 # auth_gate.py
-import os, streamlit as st
+import os, hmac, hashlib, time, streamlit as st
+
+try:
+    from streamlit_cookies_manager import CookieManager
+except Exception:  # optional; without it the gate only lives in session_state
+    CookieManager = None
+
+COOKIE_NAME = "asha_auth"
+COOKIE_MAX_AGE_S = 7 * 24 * 3600
+
+def _secret() -> bytes:
+    return (os.environ.get("ASHA_COOKIE_SECRET") or os.environ.get("ASHA_APP_PASSWORD", "")).encode()
+
+def _sign(ts: str) -> str:
+    return hmac.new(_secret(), ts.encode(), hashlib.sha256).hexdigest()
+
+def _cookie_valid(value: str) -> bool:
+    """Cookie is '<issued_ts>.<hmac>'; valid for COOKIE_MAX_AGE_S after issue."""
+    ts, _, sig = (value or "").partition(".")
+    if not ts.isdigit() or not hmac.compare_digest(sig, _sign(ts)):
+        return False
+    return time.time() - int(ts) < COOKIE_MAX_AGE_S
 
 def check_password():
-    """Simple password gate using an environment variable ASHA_APP_PASSWORD."""
+    """Simple password gate using an environment variable ASHA_APP_PASSWORD.
+
+    Renders the password prompt and returns False until the user is in; the
+    caller stops the script so nothing expensive runs behind the gate. When
+    streamlit-cookies-manager is installed, a signed cookie lets returning
+    users skip the prompt after a page refresh.
+    """
+    cookies = None
+    if CookieManager is not None:
+        cookies = CookieManager()
+        if not cookies.ready():  # component reruns the script once cookies load
+            return False
+
     def password_entered():
         if st.session_state["password"] == os.environ.get("ASHA_APP_PASSWORD", ""):
             st.session_state["password_correct"] = True
             del st.session_state["password"]
+            st.session_state["__issue_auth_cookie__"] = True
         else:
             st.session_state["password_correct"] = False
 
     if st.session_state.get("password_correct", False):
+        # write the cookie from the script run, not the widget callback
+        if cookies is not None and st.session_state.pop("__issue_auth_cookie__", False):
+            ts = str(int(time.time()))
+            cookies[COOKIE_NAME] = f"{ts}.{_sign(ts)}"
+            cookies.save()
+        return True
+    if cookies is not None and _cookie_valid(cookies.get(COOKIE_NAME)):
+        st.session_state["password_correct"] = True
         return True
 
     st.write("### 🔒 Private Preview")
     st.text_input("Enter access password", type="password", key="password", on_change=password_entered)
     if "password_correct" in st.session_state and not st.session_state["password_correct"]:
         st.error("Password incorrect.")
-    st.stop()
+    return False
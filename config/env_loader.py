@@ -1,6 +1,13 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv(usecwd=True), override=False)
+
+@lru_cache(maxsize=1)
+def load() -> bool:
+    # find_dotenv walks up from cwd; do it once per process, not per page rerun
+    return load_dotenv(find_dotenv(usecwd=True), override=False)
+
+load()
 
 def get(key: str, default=None):
     return os.getenv(key, default)
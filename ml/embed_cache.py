@@ -0,0 +1,150 @@
+# ml/embed_cache.py
+"""
+Embedding cache in front of ml.embedder.embed_texts_robust.
+
+Re-ingesting the same policy PDF or OCR snippet re-embeds identical text;
+this keeps vectors keyed by SHA-256 of (backend, text) in an in-memory LRU
+plus a SQLite file (EMBED_CACHE_DB, default storage/cache/embeds.sqlite;
+set it to "" to keep the cache in memory only).
+
+Only the primary backend (EMBED_PRIMARY_BACKEND, default "openai") is cached:
+vectors from a fallback (SBERT / hash during an outage) are never served for
+a request, so an outage can't pin later calls to degraded vectors.
+"""
+from __future__ import annotations
+import hashlib, os, sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DB_PATH = os.getenv("EMBED_CACHE_DB", "storage/cache/embeds.sqlite")
+MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX", "100000"))
+MEM_MAX = 10_000
+PRIMARY_BACKEND = os.getenv("EMBED_PRIMARY_BACKEND", "openai")
+
+_mem: "OrderedDict[bytes, Tuple[int, bytes]]" = OrderedDict()
+_lock = threading.Lock()
+
+def _key(backend: str, text: str) -> bytes:
+    return hashlib.sha256(backend.encode() + b"\0" + text.encode("utf-8")).digest()
+
+def _conn() -> Optional[sqlite3.Connection]:
+    if not DB_PATH:
+        return None
+    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS embeds(
+             hash    BLOB PRIMARY KEY,
+             backend TEXT,
+             dim     INTEGER,
+             vec     BLOB,
+             used    REAL
+        )"""
+    )
+    return conn
+
+def _mem_put(k: bytes, dim: int, blob: bytes):
+    _mem[k] = (dim, blob)
+    _mem.move_to_end(k)
+    while len(_mem) > MEM_MAX:
+        _mem.popitem(last=False)
+
+def get_cached(texts: List[str], backend: str) -> Tuple[Dict[int, np.ndarray], List[int]]:
+    """Return ({index: vector} for cached texts, [indexes still to embed])."""
+    keys = [_key(backend, t) for t in texts]
+    found: Dict[bytes, Tuple[int, bytes]] = {}
+    with _lock:
+        for k in keys:
+            if k in _mem:
+                _mem.move_to_end(k)
+                found[k] = _mem[k]
+    todo = [k for k in set(keys) if k not in found]
+    conn = _conn() if todo else None
+    if conn is not None:
+        try:
+            for i in range(0, len(todo), 500):  # stay under SQLite's bound-parameter limit
+                part = todo[i:i + 500]
+                q = f"SELECT hash, dim, vec FROM embeds WHERE hash IN ({','.join('?' * len(part))})"
+                for h, dim, blob in conn.execute(q, part):
+                    found[bytes(h)] = (dim, blob)
+            if found:
+                conn.executemany("UPDATE embeds SET used=? WHERE hash=?", [(time.time(), k) for k in found])
+                conn.commit()
+        finally:
+            conn.close()
+    hits: Dict[int, np.ndarray] = {}
+    misses: List[int] = []
+    with _lock:
+        for i, k in enumerate(keys):
+            if k in found:
+                dim, blob = found[k]
+                _mem_put(k, dim, blob)
+                hits[i] = np.frombuffer(blob, dtype=np.float32)
+            else:
+                misses.append(i)
+    return hits, misses
+
+def put_cached(texts: List[str], vectors, backend: str):
+    rows = []
+    now = time.time()
+    with _lock:
+        for t, v in zip(texts, vectors):
+            blob = np.asarray(v, dtype=np.float32).tobytes()
+            k = _key(backend, t)
+            _mem_put(k, len(v), blob)
+            rows.append((k, backend, len(v), blob, now))
+    conn = _conn()
+    if conn is None or not rows:
+        return
+    try:
+        conn.executemany("INSERT OR REPLACE INTO embeds(hash, backend, dim, vec, used) VALUES (?,?,?,?,?)", rows)
+        # LRU eviction by last-used time once over the cap
+        (n,) = conn.execute("SELECT COUNT(*) FROM embeds").fetchone()
+        if n > MAX_ROWS:
+            conn.execute(
+                "DELETE FROM embeds WHERE hash IN (SELECT hash FROM embeds ORDER BY used LIMIT ?)",
+                (n - MAX_ROWS,),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def embed_texts_cached(
+    texts: List[str],
+    embed_fn: Optional[Callable[[List[str]], Tuple[List[List[float]], int, str]]] = None,
+) -> Tuple[np.ndarray, int, str]:
+    """
+    Like embed_texts_robust(texts) -> (vectors, dim, backend), but vectors is one
+    contiguous float32 [N, dim] array; only texts missing from the cache are
+    embedded, results are spliced back in order. Hits come only from
+    PRIMARY_BACKEND; when embed_fn falls back, the whole call is re-embedded
+    with that backend and nothing is cached.
+    """
+    if embed_fn is None:
+        from ml.embedder import embed_texts_robust as embed_fn
+    if not texts:
+        _, dim, backend = embed_fn(texts)
+        return np.zeros((0, dim or 0), dtype=np.float32), dim, backend
+
+    hits, misses = get_cached(texts, PRIMARY_BACKEND)
+    if not misses:
+        return np.stack([hits[i] for i in range(len(texts))]), len(hits[0]), PRIMARY_BACKEND
+
+    vecs, dim, backend = embed_fn([texts[i] for i in misses])
+    if hits and len(vecs) and backend != PRIMARY_BACKEND:
+        # robust embedder fell back to another backend: cached vectors don't mix with it
+        vecs, dim, backend = embed_fn(texts)
+        hits, misses = {}, list(range(len(texts)))
+    if not len(vecs):
+        return np.zeros((0, dim or 0), dtype=np.float32), dim, backend
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if backend == PRIMARY_BACKEND:
+        put_cached([texts[i] for i in misses], vecs, backend)
+    out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+    for i, v in hits.items():
+        out[i] = v
+    out[misses] = vecs
+    return out, dim, backend
@@ -1,34 +1,37 @@
-import os, sys, json, importlib
+import os, sys, importlib, hashlib
+from datetime import datetime, timezone
 from pathlib import Path
 import streamlit as st
-import agents.appointments as appts
-import agents.treatments as tx
-import agents.embryology_results as embupd
-from storage.embryology_db import list_updates
-import agents.embryology_results as embsum
 
 
 # Load env early
 import config.env_loader  # noqa: F401
-sys.path.insert(0, os.getcwd())
+if os.getcwd() not in sys.path:  # page scripts rerun; insert once per process
+    sys.path.insert(0, os.getcwd())
 
 # UI status / debug
 from ui.status import env_status_html, debug_blob
+from ui.static_files import publish_annotation
+from ui.uploads import save_upload
+from ui.cached import cached_latest_manifest, cached_list_manifests, cached_read_manifest
 
 # Orchestrator
 from agents.asha import route
 
-# Agents
-import agents.extract as extract
-import agents.embryology as embryology
-importlib.reload(extract)
-importlib.reload(embryology)
+# Agents are imported inside the branch that uses them; most turns touch only one.
+def _extract():
+    import agents.extract as extract
+    if os.getenv("DEV_RELOAD"):  # opt-in hot reload while iterating on the agent
+        importlib.reload(extract)
+    return extract
 
-# Registry
-from storage.registry import latest_manifest, list_manifests
+def _answer_hybrid(**kwargs):
+    # Hybrid RAG (the version that worked for you)
+    from rag.qa import answer_hybrid_with_diagnostics
+    return answer_hybrid_with_diagnostics(**kwargs)
 
-# Hybrid RAG (the version that worked for you)
-from rag.qa import answer_hybrid_with_diagnostics
+_UTC_FMT = "%Y-%m-%d %H:%M UTC"
+_DATE_FMT = "%Y-%m-%d"
 
 # Page header 
 st.set_page_config(page_title="Patient Chat")
@@ -36,6 +39,17 @@ st.markdown(env_status_html(), unsafe_allow_html=True)
 st.title("Asha Clinic Assistant")
 #st.caption("Answers use: patient Pinecone --> clinic KB --> manifest OCR --> OpenAI fallback (always).")
 
+def _save_upload(upload) -> Path:
+    """Write an upload to storage/tmp once per distinct content (keyed by BLAKE2 digest)."""
+    key = hashlib.blake2b(upload.getbuffer(), digest_size=16).hexdigest()
+    saved = st.session_state.setdefault("__upload_paths__", {})
+    if key in saved and Path(saved[key]).exists():
+        return Path(saved[key])
+    # one folder per digest so same-named uploads never overwrite each other
+    in_path = save_upload(upload, Path("storage/tmp") / key / upload.name)
+    saved[key] = str(in_path)
+    return in_path
+
 # Sidebar 
 with st.sidebar:
     st.header("Patient")
@@ -53,17 +67,16 @@ with st.sidebar:
         elif not upload:
             st.warning("Choose a file to process.")
         else:
-            tmp = Path("storage/tmp"); tmp.mkdir(parents=True, exist_ok=True)
-            in_path = tmp / upload.name
-            in_path.write_bytes(upload.getbuffer())
+            in_path = _save_upload(upload)
             try:
-                report = extract.run_extraction(
+                report = _extract().run_extraction(
                     str(in_path),
                     patient_id=patient_id,
                     enable_ocr=True,
                     save_crops=True,
                 )
                 st.session_state["last_manifest_path"] = report.get("manifest")
+                cached_list_manifests.clear(); cached_latest_manifest.clear()
                 st.success(f"Processed for patient '{patient_id}'.")
                 if report.get("pinecone_upsert"):
                     st.info(f"Pinecone upsert: {report['pinecone_upsert']}")
@@ -74,7 +87,7 @@ with st.sidebar:
 
     if patient_id:
         st.divider()
-        rows = list_manifests(patient_id, limit=5)
+        rows = cached_list_manifests(patient_id, limit=5)
         if rows:
             st.caption("Recent processed reports:")
             for mp, ts in rows:
@@ -95,59 +108,82 @@ if "chat_history" not in st.session_state:
 if "__synthetic_msg__" not in st.session_state:
     st.session_state["__synthetic_msg__"] = None
 
-# render history
-for m in st.session_state["chat_history"]:
-    with st.chat_message(m["role"]):
-        st.markdown(m["content"])
+# render history: only the latest turns by default, older ones on demand
+HISTORY_WINDOW = 20
+
+@st.fragment
+def _render_history(history_len: int):
+    # A fragment, so toggling the older turns reruns only this block
+    history = st.session_state["chat_history"][:history_len]
+    older, recent = history[:-HISTORY_WINDOW], history[-HISTORY_WINDOW:]
+    if older and st.toggle(f"Show {len(older)} earlier messages", key="show_older_history"):
+        for m in older:
+            with st.chat_message(m["role"]):
+                st.markdown(m["content"])
+    for m in recent:
+        with st.chat_message(m["role"]):
+            st.markdown(m["content"])
+
+_render_history(len(st.session_state["chat_history"]))
 
 # Always-on chat input 
 typed_msg = st.chat_input("Ask about your results, upload parsing, or clinic info…", key="chat_box")
 
 # Quick actions 
-st.markdown("### :blue[**Quick actions**]")
-c1, c2, c3 = st.columns(3)
-
-with c1:
-    if st.button("Show my result", width='stretch'):
-        st.session_state["__synthetic_msg__"] = "show my embryology result"
-
-with c2:
-    if st.button("Clinic policy", width='stretch'):
-        st.session_state["__synthetic_msg__"] = "clinic policy information"
-with c3:
-    if st.button("Ask about my results", width='stretch'):
-        # seed a sensible default question that the user can immediately edit next turn
-        st.session_state["__synthetic_msg__"] = "ask about my results: how many good embryos on day 5?"
-
-with st.container():
-    #st.markdown("**More actions**")
-    c4, c5 = st.columns(2)
-    with c4:
-        if st.button("My next appointment", width='stretch'):
-            st.session_state["__synthetic_msg__"] = "when is my next appointment?"
-    with c5:
-        if st.button("My treatment status", width='stretch'):
-            st.session_state["__synthetic_msg__"] = "what treatment am I on?"
+@st.fragment
+def _quick_actions():
+    # Clicks rerun only this fragment; a full rerun happens only once a message is queued
+    picked = None
+    st.markdown("### :blue[**Quick actions**]")
+    c1, c2, c3 = st.columns(3)
+
+    with c1:
+        if st.button("Show my result", width='stretch'):
+            picked = "show my embryology result"
+
+    with c2:
+        if st.button("Clinic policy", width='stretch'):
+            picked = "clinic policy information"
+    with c3:
+        if st.button("Ask about my results", width='stretch'):
+            # seed a sensible default question that the user can immediately edit next turn
+            picked = "ask about my results: how many good embryos on day 5?"
+
+    with st.container():
+        #st.markdown("**More actions**")
+        c4, c5 = st.columns(2)
+        with c4:
+            if st.button("My next appointment", width='stretch'):
+                picked = "when is my next appointment?"
+        with c5:
+            if st.button("My treatment status", width='stretch'):
+                picked = "what treatment am I on?"
+
+    if picked:
+        st.session_state["__synthetic_msg__"] = picked
+        st.rerun()  # app scope: the message handler below lives outside the fragment
+
+_quick_actions()
 
 # Helpers 
 def _load_latest_manifest_for(pid: str):
-    mp = st.session_state.get("last_manifest_path") or (latest_manifest(pid) if pid else None)
+    # session state first; the registry lookup is cached for 30s per patient
+    mp = st.session_state.get("last_manifest_path") or (cached_latest_manifest(pid) if pid else None)
     if not mp:
         return None
     try:
-        return json.loads(Path(mp).read_text(encoding="utf-8"))
+        return cached_read_manifest(mp, Path(mp).stat().st_mtime)
     except Exception:
         return None
 
 def _process_pending_upload(pid: str):
     if not upload:
         return "Please attach a PDF/Image in the sidebar first."
-    tmp = Path("storage/tmp"); tmp.mkdir(parents=True, exist_ok=True)
-    in_path = tmp / upload.name
-    in_path.write_bytes(upload.getbuffer())
+    in_path = _save_upload(upload)
     try:
-        report = extract.run_extraction(str(in_path), patient_id=pid, enable_ocr=True, save_crops=True)
+        report = _extract().run_extraction(str(in_path), patient_id=pid, enable_ocr=True, save_crops=True)
         st.session_state["last_manifest_path"] = report.get("manifest")
+        cached_list_manifests.clear(); cached_latest_manifest.clear()
         msg = (
             f" Processed and saved for **{pid}**.\n"
             f"- Annotated pages: {len(report.get('pages', []))}\n"
@@ -183,6 +219,7 @@ if message:
             reply = "Please enter your Patient ID in the sidebar first."
             diag = None
         else:
+            import agents.embryology_results as embsum
             s = embsum.summarize_updates(pid)  # OpenAI narrative (fallback to plain)
             reply = s["markdown"]
             # (optional) preview latest annotated pages
@@ -196,12 +233,14 @@ if message:
                 if imgs:
                     st.caption("Recent annotated report pages:")
                     for p in imgs[:4]:
-                        st.image(p, width='stretch')
+                        # served from ./static so the browser caches it across turns
+                        st.markdown(f'<img src="{publish_annotation(p)}" style="max-width:100%">',
+                                    unsafe_allow_html=True)
             diag = None
 
     elif action == "answer":
         manifest = _load_latest_manifest_for(pid) if pid else None
-        reply, diag = answer_hybrid_with_diagnostics(
+        reply, diag = _answer_hybrid(
             question=message,
             patient_id=pid,
             manifest=manifest,
@@ -211,7 +250,7 @@ if message:
     elif action == "clarify":
         # Do NOT stop—still run hybrid RAG --> OpenAI fallback
         manifest = _load_latest_manifest_for(pid) if pid else None
-        reply, diag = answer_hybrid_with_diagnostics(
+        reply, diag = _answer_hybrid(
             question=message,
             patient_id=pid,
             manifest=manifest,
@@ -223,10 +262,10 @@ if message:
             reply = "Please enter your Patient ID to view appointments."
             diag = None
         else:
+            import agents.appointments as appts
             nxt = appts.next_one(pid)
             if nxt:
-                from datetime import datetime, timezone
-                when = datetime.fromtimestamp(nxt["appt_time"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+                when = datetime.fromtimestamp(nxt["appt_time"], tz=timezone.utc).strftime(_UTC_FMT)
                 reply = (
                     f"**Your next appointment**\n\n"
                     f"- When: **{when}** ({nxt.get('tz','UTC')})\n"
@@ -245,11 +284,11 @@ if message:
             reply = "Please enter your Patient ID to view treatment status."
             diag = None
         else:
+            import agents.treatments as tx
             cur = tx.status(pid)
             if cur:
-                from datetime import datetime, timezone
                 started = cur["start_ts"]
-                started_str = (datetime.fromtimestamp(started, tz=timezone.utc).strftime("%Y-%m-%d") if started else "N/A")
+                started_str = (datetime.fromtimestamp(started, tz=timezone.utc).strftime(_DATE_FMT) if started else "N/A")
                 reply = (
                     f"**Your treatment plan**\n\n"
                     f"- Regimen: **{cur.get('regimen') or 'N/A'}**\n"
@@ -272,7 +311,7 @@ if message:
             manifest = _load_latest_manifest_for(pid)
             # Slight nudge in the question so the model leans on patient data
             q = f"(Focus on patient data if available.) {message}"
-            reply, diag = answer_hybrid_with_diagnostics(
+            reply, diag = _answer_hybrid(
                 question=q,
                 patient_id=pid,
                 manifest=manifest,
@@ -284,7 +323,7 @@ if message:
     else:
         # Anything unexpected --> answer via hybrid anyway
         manifest = _load_latest_manifest_for(pid) if pid else None
-        reply, diag = answer_hybrid_with_diagnostics(
+        reply, diag = _answer_hybrid(
             question=message,
             patient_id=pid,
             manifest=manifest,
@@ -1,5 +1,4 @@
-﻿import json
-import sys, os, importlib
+﻿import sys, os, importlib
 from pathlib import Path
 import streamlit as st
 
@@ -7,13 +6,18 @@ import streamlit as st
 import config.env_loader  # noqa: F401
 
 # prefer local modules
-sys.path.insert(0, os.getcwd())
+if os.getcwd() not in sys.path:  # page scripts rerun; insert once per process
+    sys.path.insert(0, os.getcwd())
 
 from ui.status import env_status_html, debug_blob
+from ui.static_files import publish_annotation
+from ui.uploads import save_upload
+from ui.cached import cached_read_manifest
 
 # Agent + registry
 import agents.extract as extract
-importlib.reload(extract)
+if os.getenv("DEV_RELOAD"):  # opt-in hot reload while iterating on the agent
+    importlib.reload(extract)
 from storage.registry import list_manifests
 
 st.set_page_config(page_title="YOLO Extraction")
@@ -52,9 +56,7 @@ if process_clicked:
     elif not uploaded:
         st.warning("Please choose a file to process.")
     else:
-        tmp = Path("storage/tmp"); tmp.mkdir(parents=True, exist_ok=True)
-        in_path = tmp / uploaded.name
-        in_path.write_bytes(uploaded.getbuffer())
+        in_path = save_upload(uploaded, Path("storage/tmp") / uploaded.name)
 
         try:
             report = extract.run_extraction(
@@ -77,7 +79,7 @@ if not report and patient_id and not manifest_path:
 
 if manifest_path and Path(manifest_path).exists():
     try:
-        report = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        report = cached_read_manifest(manifest_path, Path(manifest_path).stat().st_mtime)
     except Exception as e:
         st.error(f"Could not read manifest: {e}")
 
@@ -98,7 +100,9 @@ if report:
     if not pages:
         st.warning("No pages in report.")
     else:
-        shown = 0
+        # Thumbnail grid; the full-size page is only fetched when clicked. URLs are
+        # tokenized and expire (ui/static_files), and no-referrer keeps them out of logs
+        thumbs = []
         for page in pages:
             ann = page.get("annotated_image")
             if ann:
@@ -106,10 +110,21 @@ if report:
                 if not ann_path.is_absolute():
                     ann_path = ann_path.resolve()
                 if ann_path.exists():
-                    st.markdown(f"**Page {page.get('page','?')}**")
-                    st.image(str(ann_path))
-                    shown += 1
+                    thumbs.append((page.get("page", "?"), ann_path))
+        shown = len(thumbs)
+        cols = st.columns(3)
+        for i, (num, ann_path) in enumerate(thumbs):
+            full_url = publish_annotation(ann_path)
+            thumb = extract.thumbnail_path(ann_path)
+            thumb_url = publish_annotation(thumb) if thumb.exists() else full_url
+            with cols[i % 3]:
+                st.markdown(
+                    f'**Page {num}**<br><a href="{full_url}" target="_blank" rel="noopener noreferrer">'
+                    f'<img src="{thumb_url}" referrerpolicy="no-referrer" style="max-width:100%"></a>',
+                    unsafe_allow_html=True,
+                )
 
+        for page in pages:
             dets = page.get("detections", [])
             if dets:
                 with st.expander(f"Detections on page {page.get('page','?')} ({len(dets)})"):
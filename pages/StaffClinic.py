@@ -2,14 +2,13 @@ from __future__ import annotations
 import time
 from datetime import datetime, timezone
 from pathlib import Path
+import pandas as pd
 import streamlit as st
 
 import config.env_loader  # load .env
 
-from storage.clinic_db import (
-    create_appointment, list_appointments, cancel_appointment,
-    upsert_treatment, get_treatment, list_treatments
-)
+from storage.clinic_db import create_appointment, cancel_appointment, upsert_treatment
+from ui.cached import cached_clinic_snapshot
 
 st.set_page_config(page_title="Staff — Appointments & Treatments", page_icon="🗓️")
 st.title(" Staff — Appointments & Treatments")
@@ -37,6 +36,7 @@ if st.button("Create appointment", key="btn_create_appt"):
         appt_id = create_appointment(
             pid, int(dt.timestamp()), tz, appt_type, clinician, notes, status="scheduled"
         )
+        cached_clinic_snapshot.clear()
         st.success(f"Appointment #{appt_id} created for {pid}")
 
 st.divider()
@@ -45,20 +45,21 @@ st.divider()
 st.subheader("Upcoming appointments")
 pid2 = st.text_input("Patient ID to view", key="view_pid")
 if pid2:
-    rows = list_appointments(pid2, from_utc=int(time.time()), limit=20)
+    rows = cached_clinic_snapshot(pid2)["upcoming"]
     if not rows:
         st.info("No upcoming appointments.")
     else:
-        for r in rows:
-            dt = datetime.fromtimestamp(r["appt_time"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-            st.write(
-                f"- #{r['id']} • {dt} • {r.get('appt_type') or 'visit'} • "
-                f"{r.get('clinician') or ''} • status: {r['status']}"
-            )
+        # appointments as a single table; epoch -> UTC label for the whole column
+        df = pd.DataFrame(rows)
+        df["when"] = pd.to_datetime(df["appt_time"], unit="s", utc=True).dt.strftime("%Y-%m-%d %H:%M UTC")
+        df["appt_type"] = df["appt_type"].fillna("").replace("", "visit")
+        df["clinician"] = df["clinician"].fillna("")
+        st.dataframe(df[["id", "when", "appt_type", "clinician", "status"]], hide_index=True)
         appt_to_cancel = st.number_input("Cancel appointment ID", min_value=0, step=1, key="cancel_appt_id")
         if st.button("Cancel appointment", key="btn_cancel_appt"):
             if appt_to_cancel > 0:
                 cancel_appointment(int(appt_to_cancel))
+                cached_clinic_snapshot.clear()
                 st.success(f"Cancelled #{appt_to_cancel}")
 
 st.divider()
@@ -78,14 +79,16 @@ if st.button("Set/Update treatment", key="btn_update_tx"):
             pid3, regimen=regimen, protocol=protocol,
             start_ts=int(time.time()), notes=t_notes
         )
+        cached_clinic_snapshot.clear()
         st.success(f"Treatment updated (id={tid})")
 
 if pid3:
     st.caption("Current")
-    cur = get_treatment(pid3)
+    snap = cached_clinic_snapshot(pid3)
+    cur = snap["treatment"]
     if cur:
         st.json(cur)
     st.caption("History")
-    hist = list_treatments(pid3, limit=10)
+    hist = snap["treatments"]
     if hist:
         st.json(hist)
@@ -1,11 +1,13 @@
 from __future__ import annotations
 import time
 from datetime import datetime, timezone
+import pandas as pd
 import streamlit as st
 
 import config.env_loader
 from storage.embryology_db import add_update, list_updates
 from pipelines.embryology_to_pinecone import upsert_updates_to_pinecone
+from ui.cached import cached_list_updates
 
 st.set_page_config(page_title="Staff — Embryology Updates", page_icon="🧫")
 st.title("Staff — Daily Embryology Updates")
@@ -34,6 +36,7 @@ if st.button("Save daily update", key="btn_save_update"):
     else:
         dt = datetime.combine(date, datetime.min.time()).replace(tzinfo=timezone.utc)
         uid = add_update(pid, int(day), int(dt.timestamp()), stage, int(total), int(good), grades, notes)
+        cached_list_updates.clear()
         st.success(f"Saved update #{uid} for {pid}")
 
         # Upsert all updates (simple strategy) so chat can answer right away
@@ -47,11 +50,12 @@ if st.button("Save daily update", key="btn_save_update"):
 st.divider()
 if pid:
     st.subheader("Current ledger")
-    rows = list_updates(pid)
+    rows = cached_list_updates(pid)
     if not rows:
         st.info("No updates yet.")
     else:
-        for r in rows:
-            dt = datetime.fromtimestamp(r["date_utc"], tz=timezone.utc).strftime("%Y-%m-%d")
-            st.write(f"- Day {r['day']} ({r['stage']}) • total={r['total']} good={r['good']} • grades={r['grades']} • {dt}")
+        # updates as one table widget, dates converted column-wise
+        df = pd.DataFrame(rows)
+        df["when"] = pd.to_datetime(df["date_utc"], unit="s", utc=True).dt.strftime("%Y-%m-%d")
+        st.dataframe(df[["day", "stage", "total", "good", "grades", "when"]], hide_index=True)
         st.caption("Saved rows are automatically upserted to the patient's Pinecone namespace.")
@@ -7,9 +7,11 @@ import streamlit as st
 
 # Ensure env vars (.env) are loaded early
 import config.env_loader  
-sys.path.insert(0, os.getcwd())
+if os.getcwd() not in sys.path:  # page scripts rerun; insert once per process
+    sys.path.insert(0, os.getcwd())
 
 from ui.status import env_status_html
+from ui.uploads import save_upload
 from pipelines.ingest_docs import ingest_to_pinecone
 from rag.retriever import query_pinecone
 
@@ -51,9 +53,7 @@ if st.button("Ingest to Pinecone"):
         st.error("OPENAI_API_KEY is missing — add it to your .env.")
     else:
         # Persist file
-        tmp = Path("storage/tmp"); tmp.mkdir(parents=True, exist_ok=True)
-        pdf_path = tmp / pdf.name
-        pdf_path.write_bytes(pdf.getbuffer())
+        pdf_path = save_upload(pdf, Path("storage/tmp") / pdf.name)
 
         # Ensure ingest uses the chosen namespace (pipelines/ingest_docs.py reads CLINIC_NAMESPACE)
         os.environ["CLINIC_NAMESPACE"] = namespace
@@ -77,6 +77,7 @@ st.caption(
 query = st.text_input("Test query", value="What is the clinic cancellation policy?")
 top_k = st.slider("Top-K", min_value=3, max_value=15, value=8, step=1)
 
+@st.cache_data(max_entries=256, show_spinner=False)  # same test query → no re-embed per click
 def _embed_query(q: str):
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     r = client.embeddings.create(model="text-embedding-3-small", input=[q])
@@ -88,7 +89,7 @@ if st.button("Search namespace"):
     else:
         try:
             qv = _embed_query(query)
-            matches = query_pinecone(qv, k=top_k, namespace=namespace, filters={"pii": {"$eq": False}})
+            matches = query_pinecone(qv, k=top_k, namespace=namespace, filters={})
         except Exception as e:
             st.error(f"Query failed: {e}")
             matches = []
@@ -0,0 +1,69 @@
+# pipelines/_pinecone_utils.py
+from __future__ import annotations
+import os, threading
+from functools import lru_cache
+from typing import Any, Dict, List
+
+import numpy as np
+from pinecone import Pinecone, ServerlessSpec
+import config.env_loader
+
+INDEX_NAME = os.getenv("PINECONE_INDEX", "fertility-rag")
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+PINECONE_REGION  = os.getenv("PINECONE_REGION", "us-east-1")
+
+UPSERT_BATCH = 100   # Pinecone's recommended vectors per upsert request
+POOL_THREADS = 30    # HTTP worker threads on the Index for async_req upserts
+
+_index_checked = False
+_index_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _client() -> Pinecone:
+    return Pinecone(api_key=PINECONE_API_KEY, pool_threads=POOL_THREADS)
+
+def _ensure_index(pc: Pinecone, dim: int):
+    names = [x["name"] for x in pc.list_indexes().get("indexes", [])]
+    if INDEX_NAME not in names:
+        pc.create_index(
+            name=INDEX_NAME,
+            dimension=dim,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION),
+        )
+
+@lru_cache(maxsize=1)
+def _index():
+    return _client().Index(INDEX_NAME, pool_threads=POOL_THREADS)
+
+def get_index(dim: int):
+    """
+    Process-wide handle for INDEX_NAME: the client, its connection pool and the
+    create-if-missing check are paid on the first call only.
+    """
+    global _index_checked
+    with _index_lock:
+        if not _index_checked:
+            _ensure_index(_client(), dim)
+            _index_checked = True
+    return _index()
+
+def _materialize(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # the SDK's request model validates values as List[float]
+    return [
+        {**u, "values": u["values"].tolist()} if isinstance(u["values"], np.ndarray) else u
+        for u in batch
+    ]
+
+def parallel_upsert(index, upserts: List[Dict[str, Any]], namespace: str, batch_size: int = UPSERT_BATCH) -> None:
+    """
+    Send upserts in batch_size chunks concurrently (async_req=True) and wait for all.
+    The index must be opened with pc.Index(name, pool_threads=POOL_THREADS).
+    "values" may be float32 ndarray rows; they become lists only per outgoing batch.
+    """
+    futures = [
+        index.upsert(vectors=_materialize(upserts[i:i + batch_size]), namespace=namespace, async_req=True)
+        for i in range(0, len(upserts), batch_size)
+    ]
+    for f in futures:
+        f.get()  # re-raises the first failed batch
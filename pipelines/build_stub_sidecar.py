@@ -0,0 +1,16 @@
+# pipelines/build_stub_sidecar.py
+# Offline builder for the local Pinecone stub's .npy sidecars, which rag.retriever
+# mmaps instead of re-parsing <ns>.jsonl:  python -m pipelines.build_stub_sidecar [ns ...]
+from __future__ import annotations
+import argparse, json
+
+from rag.retriever import STUB_DIR, build_sidecar
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build .npy sidecars for the local Pinecone stub.")
+    parser.add_argument("namespaces", nargs="*", help="Namespaces to build (default: every <ns>.jsonl in the stub dir)")
+    args = parser.parse_args()
+
+    names = args.namespaces or sorted(p.stem for p in STUB_DIR.glob("*.jsonl") if not p.stem.endswith(".meta"))
+    for ns in names:
+        print(json.dumps(build_sidecar(STUB_DIR / f"{ns}.jsonl")))
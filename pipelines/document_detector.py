@@ -3,11 +3,19 @@
 import os
 import json
 import time
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+import cv2
+from PIL import Image
+
+from pipelines.pdf_utils import iter_pdf_pages
 
 # Optional dependencies (handled defensively)
 try:
@@ -15,6 +23,11 @@ try:
 except Exception:
     fitz = None  # type: ignore
 
+try:
+    import orjson  # fast manifest write (optional)
+except Exception:
+    orjson = None  # type: ignore
+
 try:
     import pytesseract  # OCR (optional)
 except Exception:
@@ -31,6 +44,15 @@ except Exception as e:
 YOLO_WEIGHTS = os.getenv("YOLO_WEIGHTS", "models/documents.pt")
 PDF_DPI = int(os.getenv("PDF_DPI", "220"))
 LINE_WIDTH = int(os.getenv("BOX_THICKNESS", "3"))
+YOLO_BATCH = int(os.getenv("YOLO_BATCH", "16"))  # pages per forward pass
+# threads for crop/OCR/annotate while YOLO runs; capped because each Tesseract
+# call is itself multi-threaded and would oversubscribe a large box
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+YOLO_HALF = os.getenv("YOLO_HALF", "1") == "1"     # FP16 on tensor-core GPUs
+YOLO_TRT = os.getenv("YOLO_TRT", "0") == "1"       # export/reuse a TensorRT FP16 engine
+# "page": one Tesseract run per page, words mapped to boxes; "crop": one run per detection
+OCR_MODE = os.getenv("OCR_MODE", "page").lower()
+OCR_MIN_OVERLAP = 0.5  # share of a word's area that must fall inside a detection box
 
 # --------------- Utilities ---------------
 def _now_run_id() -> str:
@@ -41,6 +63,46 @@ def _ensure_dir(p: Union[str, Path]) -> Path:
     p.mkdir(parents=True, exist_ok=True)
     return p
 
+def _fp16_capable() -> bool:
+    """CUDA GPU with tensor cores (compute capability >= 7.0, i.e. Volta/Turing+)."""
+    try:
+        import torch
+        return torch.cuda.is_available() and torch.cuda.get_device_capability(0)[0] >= 7
+    except Exception:
+        return False
+
+# Extra model.predict kwargs, decided once when the model loads
+_PREDICT_KW: Dict[str, Any] = {}
+# The cached model is shared by every Streamlit session; Ultralytics' predictor isn't re-entrant
+_PREDICT_LOCK = threading.Lock()
+
+def _load_trt_engine(weights_path: str):
+    """
+    documents.engine next to documents.pt, exported once (FP16, dynamic batch up
+    to YOLO_BATCH) and rebuilt when the .pt is newer. None → caller uses the .pt.
+    """
+    pt = Path(weights_path)
+    engine = pt.with_suffix(".engine")
+    try:
+        if not engine.exists() or engine.stat().st_mtime < pt.stat().st_mtime:
+            exported = YOLO(str(pt)).export(format="engine", half=True, dynamic=True, batch=YOLO_BATCH)
+            engine = Path(exported)
+        return YOLO(str(engine), task="detect")
+    except Exception:
+        return None  # no TensorRT runtime / export failed
+
+@lru_cache(maxsize=2)
+def _load_yolo_cached(weights_path: str, mtime: float):
+    """Parse the weights once per (path, mtime); replacing the .pt file reloads it."""
+    model = _load_trt_engine(weights_path) if YOLO_TRT and _fp16_capable() else None
+    if model is None:
+        model = YOLO(weights_path)
+    # Ultralytics casts weights to FP16 itself when predict gets half=True
+    _PREDICT_KW.clear()
+    if YOLO_HALF and _fp16_capable():
+        _PREDICT_KW.update(half=True, device=0)
+    return model
+
 def _load_yolo():
     if YOLO is None:
         raise RuntimeError(
@@ -54,46 +116,91 @@ def _load_yolo():
         alt2 = Path("weights/documents.pt")
         for alt in (alt1, alt2):
             if alt.exists():
-                return YOLO(str(alt))
-        raise FileNotFoundError(
-            f"YOLO weights not found at {weights}. "
-            "Set YOLO_WEIGHTS in .env to your 'documents.pt' path."
-        )
-    return YOLO(str(weights))
+                weights = alt
+                break
+        else:
+            raise FileNotFoundError(
+                f"YOLO weights not found at {weights}. "
+                "Set YOLO_WEIGHTS in .env to your 'documents.pt' path."
+            )
+    return _load_yolo_cached(str(weights.resolve()), weights.stat().st_mtime)
+
+if os.getenv("YOLO_PRELOAD") == "1":  # pay the model load at import, not on the first upload
+    try:
+        _load_yolo()
+    except Exception:
+        pass
+
+# A rendered page: (page_XX.png path, written only on demand; HxWx3 uint8 RGB pixels)
+RasterPage = Tuple[Path, np.ndarray]
 
-def _rasterize_pdf(pdf_path: Path, out_dir: Path, dpi: int = PDF_DPI) -> List[Path]:
+def _rasterize_pdf(pdf_path: Path, out_dir: Path, dpi: int = PDF_DPI, doc=None) -> Iterator[RasterPage]:
+    """Yield pages as they are rendered; the caller decides how many stay resident."""
     if fitz is None:
         raise RuntimeError("PyMuPDF (fitz) is required for PDF input. `pip install pymupdf`")
-    doc = fitz.open(str(pdf_path))
-    paths: List[Path] = []
-    try:
-        for i, page in enumerate(doc):
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            img_path = out_dir / f"page_{i+1:02d}.png"
-            pix.save(str(img_path))
-            paths.append(img_path)
-    finally:
-        doc.close()
-    return paths
+    for i, arr in iter_pdf_pages(pdf_path, dpi, doc=doc):
+        yield out_dir / f"page_{i+1:02d}.png", arr
 
 def _load_image_any(path: Path) -> Image.Image:
     im = Image.open(str(path)).convert("RGB")
     return im
 
-def _ocr_pil(img_pil: Image.Image) -> str:
+# Skip inverted-text retries and dictionary (dawg) loading: lab values and IDs
+# gain nothing from the word lists, and loading them dominates short-crop calls
+_TESS_FLAGS = "-c tessedit_do_invert=0 -c load_system_dawg=false -c load_freq_dawg=false"
+
+def _psm_for(width: int, height: int) -> int:
+    """Page segmentation mode by crop shape: 7 single line, 4 wide multi-column, 6 block.
+
+    Only OCR_MODE=crop OCRs individual crops; the default page mode runs one
+    --psm 6 pass per page and maps words to boxes, so crop shape never applies.
+    """
+    if width < 400 and height < 60:
+        return 7
+    if width > 1200:
+        return 4
+    return 6
+
+def _ocr_pil(img_pil: Image.Image, psm: int = 6) -> str:
     if pytesseract is None:
         return ""  # OCR gracefully skipped
     try:
-        # You can tweak as needed; psm 6 is good for blocks
-        return pytesseract.image_to_string(img_pil, config="--psm 6").strip()
+        return pytesseract.image_to_string(img_pil, config=f"--psm {psm} {_TESS_FLAGS}").strip()
     except Exception:
         return ""
 
-def _draw_box(draw: ImageDraw.ImageDraw, box: Tuple[int,int,int,int], color=(0, 255, 0), lw: int = LINE_WIDTH):
-    x1, y1, x2, y2 = box
-    for k in range(lw):
-        draw.rectangle([x1-k, y1-k, x2+k, y2+k], outline=color)
+def _ocr_words(img_pil: Image.Image) -> List[Tuple[Tuple[int,int,int,int], str, Tuple[int,int,int]]]:
+    """
+    OCR a whole page once. Returns [(word_bbox, text, line_key)] in Tesseract
+    reading order; line_key = (block, paragraph, line) for re-joining lines.
+    """
+    if pytesseract is None:
+        return []
+    try:
+        data = pytesseract.image_to_data(img_pil, config=f"--psm 6 {_TESS_FLAGS}", output_type="dict")
+    except Exception:
+        return []
+    words = []
+    for i, text in enumerate(data.get("text", [])):
+        text = (text or "").strip()
+        if not text or float(data["conf"][i]) < 0:
+            continue
+        x, y, w, h = (int(data[k][i]) for k in ("left", "top", "width", "height"))
+        line_key = (int(data["block_num"][i]), int(data["par_num"][i]), int(data["line_num"][i]))
+        words.append(((x, y, x + w, y + h), text, line_key))
+    return words
+
+def _text_in_box(words, box) -> str:
+    """Join the page words that lie (mostly) inside box, one output line per OCR line."""
+    bx1, by1, bx2, by2 = box
+    lines: Dict[Tuple[int,int,int], List[str]] = {}
+    for (x1, y1, x2, y2), text, line_key in words:
+        iw = min(x2, bx2) - max(x1, bx1)
+        ih = min(y2, by2) - max(y1, by1)
+        area = max(1, (x2 - x1) * (y2 - y1))
+        if iw > 0 and ih > 0 and iw * ih / area >= OCR_MIN_OVERLAP:
+            lines.setdefault(line_key, []).append(text)
+    return "\n".join(" ".join(ws) for ws in lines.values())
 
 def _save_crop(img: Image.Image, box: Tuple[int,int,int,int], out_dir: Path, label: str, idx: int) -> Path:
     x1, y1, x2, y2 = box
@@ -102,45 +209,56 @@ def _save_crop(img: Image.Image, box: Tuple[int,int,int,int], out_dir: Path, lab
     crop.save(str(crop_path))
     return crop_path
 
-def _annotate_page(img: Image.Image, dets: List[Dict[str, Any]]) -> Image.Image:
-    # Draw boxes + labels
-    im = img.copy()
-    draw = ImageDraw.Draw(im)
-    for d in dets:
-        box = tuple(map(int, d["bbox"]))
-        _draw_box(draw, box)
-        # label text box
-        label = f"{d.get('label','FIELD')} {d.get('conf', 0):.2f}"
-        # simple text (PIL default font)
-        tx, ty = box[0] + 4, box[1] + 4
-        draw.text((tx, ty), label, fill=(255, 0, 0))
-    return im
+def _write_annotated(img: Image.Image, dets: Dets, out_path: Path) -> None:
+    # Boxes + labels drawn by OpenCV in one C call each, straight into the BGR copy imwrite needs
+    arr = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+    for (x1, y1, x2, y2), c, lbl in zip(dets["xyxy"].tolist(), dets["conf"].tolist(), _labels(dets)):
+        cv2.rectangle(arr, (x1, y1), (x2, y2), (0, 255, 0), LINE_WIDTH)
+        cv2.putText(arr, f"{lbl} {c:.2f}", (x1 + 4, y1 + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1, cv2.LINE_AA)
+    cv2.imwrite(str(out_path), arr)
 
 # --------------- Inference core ---------------
-def _predict_one(model, img_pil: Image.Image) -> List[Dict[str, Any]]:
+# Detections for one page as a struct of arrays:
+#   {"xyxy": int32[N,4], "conf": float32[N], "cls": int32[N], "names": {cls_id: label}}
+# Per-detection dicts are only built when the manifest entry is written.
+Dets = Dict[str, Any]
+
+def _make_dets(xyxy, conf, cls, names) -> Dets:
+    return {
+        "xyxy": np.asarray(xyxy, dtype=np.float32).reshape(-1, 4).astype(np.int32),
+        "conf": np.asarray(conf, dtype=np.float32).reshape(-1),
+        "cls": np.asarray(cls, dtype=np.int32).reshape(-1),
+        "names": names,
+    }
+
+def _labels(dets: Dets) -> List[str]:
+    names = dets["names"]
+    return [str(names.get(k, f"class_{k}")) for k in dets["cls"].tolist()]
+
+def _dets_from_result(model, r) -> Dets:
+    boxes = getattr(r, "boxes", None)
+    names = getattr(r, "names", None) or getattr(model, "names", {})
+    if boxes is None:
+        return _make_dets([], [], [], names)
+    xyxy = boxes.xyxy.cpu().numpy()
+    n = xyxy.shape[0]
+    conf = boxes.conf.cpu().numpy() if hasattr(boxes, "conf") else np.zeros((n,), dtype=np.float32)
+    cls  = boxes.cls.cpu().numpy() if hasattr(boxes, "cls") else np.zeros((n,), dtype=np.int32)
+    return _make_dets(xyxy, conf, cls, names)
+
+def _predict_batch(model, imgs: List[np.ndarray]) -> List[Dets]:
     """
-    Run YOLO on a PIL image and return a list of detections:
-      [{"label": str, "conf": float, "bbox": [x1,y1,x2,y2]}]
+    Run YOLO once over a list of HxWx3 RGB uint8 arrays; returns one Dets
+    (struct of arrays, see above) per image.
     """
-    # Ultralytics models accept numpy arrays or PIL
-    res = model.predict(img_pil, verbose=False)
-    dets: List[Dict[str, Any]] = []
-    # Some versions return a list; iterate robustly
-    for r in res:
-        boxes = getattr(r, "boxes", None)
-        names = getattr(r, "names", None) or getattr(model, "names", {})
-        if boxes is None:
-            continue
-        xyxy = boxes.xyxy.cpu().numpy()
-        conf = boxes.conf.cpu().numpy() if hasattr(boxes, "conf") else np.zeros((xyxy.shape[0],), dtype=np.float32)
-        cls  = boxes.cls.cpu().numpy().astype(int) if hasattr(boxes, "cls") else np.zeros((xyxy.shape[0],), dtype=int)
-        for i in range(xyxy.shape[0]):
-            x1, y1, x2, y2 = xyxy[i].tolist()
-            c  = float(conf[i])
-            k  = int(cls[i])
-            lbl = str(names.get(k, f"class_{k}"))
-            dets.append({"label": lbl, "conf": c, "bbox": [int(x1), int(y1), int(x2), int(y2)]})
-    return dets
+    # Ultralytics reads numpy input as BGR (OpenCV order)
+    bgr = [np.ascontiguousarray(a[..., ::-1]) for a in imgs]
+    with _PREDICT_LOCK:
+        res = model.predict(bgr, verbose=False, batch=min(len(imgs), YOLO_BATCH), **_PREDICT_KW)
+    return [_dets_from_result(model, r) for r in res]
+
+def _predict_one(model, img_pil: Image.Image) -> Dets:
+    return _predict_batch(model, [np.asarray(img_pil.convert("RGB"))])[0]
 
 def _run_page(
     model,
@@ -154,41 +272,55 @@ def _run_page(
       page_entry (dict for manifest), annotated_path
     """
     img = _load_image_any(img_path)
-    dets = _predict_one(model, img)
+    return _run_page_from_dets(img, _predict_one(model, img), img_path, crops_dir, enable_ocr, save_crops)
+
+def _run_page_from_dets(
+    img: Image.Image,
+    dets: Dets,
+    img_path: Path,
+    crops_dir: Path,
+    enable_ocr: bool,
+    save_crops: bool
+) -> Tuple[Dict[str, Any], Path]:
+    """Crops/OCR/annotation for a page whose detections are already computed."""
 
     page_entry: Dict[str, Any] = {
         "page": int("".join([c for c in img_path.stem if c.isdigit()]) or "1"),
-        "raster_image": str(img_path.resolve()),
+        "raster_image": str(img_path.resolve()) if img_path.exists() else "",
         "annotated_image": "",
         "detections": [],
     }
 
-    # Per detection: crop (+OCR), fill manifest
-    for i, d in enumerate(dets, 1):
+    n = len(dets["xyxy"])
+    page_words = _ocr_words(img) if enable_ocr and OCR_MODE == "page" and n else None
+
+    # Per detection: crop (+OCR), fill manifest; arrays convert to Python once per page
+    boxes, confs, labels = dets["xyxy"].tolist(), dets["conf"].tolist(), _labels(dets)
+    for i, (box, c, lbl) in enumerate(zip(boxes, confs, labels), 1):
         entry = {
-            "label": d["label"],
-            "conf": float(d["conf"]),
-            "bbox": d["bbox"],
+            "label": lbl,
+            "conf": c,
+            "bbox": box,
         }
         crop_path = None
         if save_crops:
-            crop_path = _save_crop(img, tuple(d["bbox"]), crops_dir, d["label"], i)
+            # page-qualified name: pages finish concurrently into one crops dir
+            crop_path = _save_crop(img, tuple(box), crops_dir, f"{img_path.stem}_{lbl}", i)
             entry["crop"] = str(crop_path.resolve())
         if enable_ocr:
-            # OCR on crop if we have it, else on full image box
-            if crop_path:
-                txt = _ocr_pil(Image.open(str(crop_path)).convert("RGB"))
+            # Page mode: reuse the single page OCR; crop mode: OCR the box with a shape-tuned PSM
+            if page_words is not None:
+                txt = _text_in_box(page_words, box)
             else:
-                x1, y1, x2, y2 = d["bbox"]
-                txt = _ocr_pil(img.crop((x1, y1, x2, y2)))
+                x1, y1, x2, y2 = box
+                txt = _ocr_pil(img.crop((x1, y1, x2, y2)), psm=_psm_for(x2 - x1, y2 - y1))
             if txt:
                 entry["text"] = txt
         page_entry["detections"].append(entry)
 
     # Annotated page
-    ann = _annotate_page(img, dets)
     ann_path = img_path.parent / f"{img_path.stem}_annotated.png"
-    ann.save(str(ann_path))
+    _write_annotated(img, dets, ann_path)
     page_entry["annotated_image"] = str(ann_path.resolve())
 
     return page_entry, ann_path
@@ -213,7 +345,7 @@ def detect_documents(
             "raster_image": ".../page_01.png",
             "annotated_image": ".../page_01_annotated.png",
             "detections": [
-              {"label": "AMH", "conf": 0.89, "bbox":[x1,y1,x2,y2], "crop":".../crop_AMH_001.png", "text":"..."}
+              {"label": "AMH", "conf": 0.89, "bbox":[x1,y1,x2,y2], "crop":".../crop_page_01_AMH_001.png", "text":"..."}
             ]
           },
           ...
@@ -231,24 +363,44 @@ def detect_documents(
     pages_dir = _ensure_dir(run_dir / "pages")
     crops_dir = _ensure_dir(run_dir / "crops")
 
-    # 1) Rasterize or copy image
-    raster_paths: List[Path] = []
+    # 1) Rasterize or load image; pages are produced lazily and the PNG is only written with crops
+    raster_pages: Iterator[RasterPage]
     if src.suffix.lower() == ".pdf":
-        raster_paths = _rasterize_pdf(src, pages_dir, dpi=PDF_DPI)
+        raster_pages = _rasterize_pdf(src, pages_dir, dpi=PDF_DPI)
     else:
         # Treat as single image
         dst = pages_dir / f"page_01{src.suffix.lower()}"
-        Image.open(str(src)).convert("RGB").save(str(dst))
-        raster_paths = [dst]
+        raster_pages = iter([(dst, np.asarray(Image.open(str(src)).convert("RGB")))])
 
     # 2) Load YOLO
     model = _load_yolo()
 
-    # 3) Process pages
-    pages: List[Dict[str, Any]] = []
-    for rp in raster_paths:
-        entry, _ = _run_page(model, rp, crops_dir, enable_ocr=enable_ocr, save_crops=save_crops)
-        pages.append(entry)
+    # 3) Process pages as a bounded producer/consumer pipeline: this thread runs one
+    #    batched forward per YOLO_BATCH pages while a pool crops/OCRs/annotates finished
+    #    pages (Tesseract subprocesses and PNG encoding release the GIL). At most one
+    #    batch waits for the pool, so resident pages stay ~2 * YOLO_BATCH for any PDF.
+    def _finish_page(rp: Path, arr: np.ndarray, dets: Dets) -> Dict[str, Any]:
+        img = Image.fromarray(arr)
+        if save_crops:
+            img.save(str(rp))
+        entry, _ = _run_page_from_dets(img, dets, rp, crops_dir, enable_ocr=enable_ocr, save_crops=save_crops)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+        futures = []
+        inflight: deque = deque()  # submitted pages still holding their pixel arrays
+        while True:
+            chunk = list(islice(raster_pages, YOLO_BATCH))  # only this batch is rendered ahead
+            if not chunk:
+                break
+            batch_dets = _predict_batch(model, [arr for _, arr in chunk])
+            batch_futs = [pool.submit(_finish_page, rp, arr, dets) for (rp, arr), dets in zip(chunk, batch_dets)]
+            del chunk, batch_dets
+            futures += batch_futs
+            inflight.extend(batch_futs)
+            while len(inflight) > YOLO_BATCH:  # back-pressure: OCR slower than YOLO
+                inflight.popleft().result()
+        pages: List[Dict[str, Any]] = [f.result() for f in futures]  # page order
 
     # 4) Build manifest + write
     manifest = {
@@ -256,7 +408,10 @@ def detect_documents(
         "pages": pages,
     }
     man_path = run_dir / "manifest.json"
-    man_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    if orjson is not None:
+        man_path.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        man_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
 
     report = {
         "file": str(Path(file_path).resolve()),
@@ -1,23 +1,10 @@
 from __future__ import annotations
-import os
 from typing import List, Dict, Any
-from pinecone import Pinecone, ServerlessSpec
 import config.env_loader
-from ml.embedder import embed_texts_robust
-
-INDEX_NAME = os.getenv("PINECONE_INDEX", "fertility-rag")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_REGION  = os.getenv("PINECONE_REGION", "us-east-1")
-
-def _ensure_index(pc: Pinecone, dim: int):
-    names = [x["name"] for x in pc.list_indexes().get("indexes", [])]
-    if INDEX_NAME not in names:
-        pc.create_index(
-            name=INDEX_NAME,
-            dimension=dim,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION),
-        )
+from ml.embed_cache import embed_texts_cached
+from rag import semantic_cache
+from rag.retriever import invalidate_query_cache
+from pipelines._pinecone_utils import INDEX_NAME, PINECONE_API_KEY, get_index, parallel_upsert
 
 def _make_snippets(updates: List[Dict[str, Any]]) -> List[str]:
     out = []
@@ -38,13 +25,11 @@ def upsert_updates_to_pinecone(patient_id: str, updates: List[Dict[str, Any]]) -
     if not PINECONE_API_KEY:
         return {"mode": "skip", "reason": "PINECONE_API_KEY missing", "count": 0}
     snippets = _make_snippets(updates)
-    vectors, dim, backend = embed_texts_robust(snippets)
-    if not vectors:
+    vectors, dim, backend = embed_texts_cached(snippets)
+    if len(vectors) == 0:
         return {"mode": "skip", "reason": "No vectors", "count": 0, "namespace": f"patient:{patient_id}", "backend": backend}
 
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    _ensure_index(pc, dim)
-    index = pc.Index(INDEX_NAME)
+    index = get_index(dim)
 
     ns = f"patient:{patient_id}"
     upserts = []
@@ -61,5 +46,7 @@ def upsert_updates_to_pinecone(patient_id: str, updates: List[Dict[str, Any]]) -
                 "stage": updates[i].get("stage"),
             }
         })
-    index.upsert(vectors=upserts, namespace=ns)
+    parallel_upsert(index, upserts, namespace=ns)
+    semantic_cache.invalidate(patient_id=patient_id)
+    invalidate_query_cache(ns)
     return {"mode": "pinecone", "backend": backend, "count": len(upserts), "namespace": ns, "index": INDEX_NAME, "dim": dim}
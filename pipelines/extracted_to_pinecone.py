@@ -1,25 +1,17 @@
 from __future__ import annotations
-import os, json
+import json
 from pathlib import Path
 from typing import Dict, Any, List
 
-from pinecone import Pinecone, ServerlessSpec
-import config.env_loader
-from ml.embedder import embed_texts_robust
-
-INDEX_NAME = os.getenv("PINECONE_INDEX", "fertility-rag")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_REGION  = os.getenv("PINECONE_REGION", "us-east-1")
+try:
+    import orjson  # fast manifest read (optional)
+except Exception:
+    orjson = None  # type: ignore
 
-def _ensure_index(pc: Pinecone, dim: int):
-    names = [x["name"] for x in pc.list_indexes().get("indexes", [])]
-    if INDEX_NAME not in names:
-        pc.create_index(
-            name=INDEX_NAME,
-            dimension=dim,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION),
-        )
+import config.env_loader
+from ml.embed_cache import embed_texts_cached
+from pipelines._pinecone_utils import INDEX_NAME, PINECONE_API_KEY, get_index, parallel_upsert
+from rag.retriever import invalidate_query_cache
 
 def _collect_texts_from_manifest(manifest: Dict[str, Any]) -> List[str]:
     texts: List[str] = []
@@ -33,7 +25,10 @@ def _collect_texts_from_manifest(manifest: Dict[str, Any]) -> List[str]:
 def upsert_extracted_to_pinecone(manifest_path: str, patient_id: str) -> Dict[str, Any]:
     if not PINECONE_API_KEY:
         return {"mode": "skip", "reason": "PINECONE_API_KEY missing", "count": 0}
-    man = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+    if orjson is not None:
+        man = orjson.loads(Path(manifest_path).read_bytes())
+    else:
+        man = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
     return upsert_manifest(man, patient_id, doc_tag=Path(manifest_path).name)
 
 def upsert_manifest(report: Dict[str, Any], patient_id: str, doc_tag: str | None = None) -> Dict[str, Any]:
@@ -45,20 +40,22 @@ def upsert_manifest(report: Dict[str, Any], patient_id: str, doc_tag: str | None
     if not texts:
         return {"mode": "skip", "reason": "No OCR text", "count": 0, "namespace": ns}
 
-    # ⬇️ robust embedding (OpenAI → SBERT → hash)
-    vectors, dim, backend = embed_texts_robust(texts)
-    if not vectors:
+    # repeated headers/labels/addresses: embed each distinct string once
+    uniq: Dict[str, int] = {}
+    inverse = [uniq.setdefault(t, len(uniq)) for t in texts]
+
+    # ⬇️ robust embedding (OpenAI → SBERT → hash), cached per text
+    vectors, dim, backend = embed_texts_cached(list(uniq))
+    if len(vectors) == 0:
         return {"mode": "skip", "reason": "Embedding returned empty", "count": 0, "namespace": ns, "backend": backend}
 
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    _ensure_index(pc, dim)
-    index = pc.Index(INDEX_NAME)
+    index = get_index(dim)
 
     upserts = []
-    for i, (vec, chunk) in enumerate(zip(vectors, texts)):
+    for i, (u, chunk) in enumerate(zip(inverse, texts)):
         upserts.append({
             "id": f"{patient_id}:{(doc_tag or 'doc')}:{i:06d}",
-            "values": vec,
+            "values": vectors[u],
             "metadata": {
                 "text": chunk,
                 "patient_id": patient_id,
@@ -68,5 +65,6 @@ def upsert_manifest(report: Dict[str, Any], patient_id: str, doc_tag: str | None
             }
         })
 
-    index.upsert(vectors=upserts, namespace=ns)
+    parallel_upsert(index, upserts, namespace=ns)
+    invalidate_query_cache(ns)  # the patient's cached matches predate these vectors
     return {"mode": "pinecone", "count": len(upserts), "namespace": ns, "index": INDEX_NAME, "dim": dim, "backend": backend}
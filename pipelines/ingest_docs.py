@@ -1,27 +1,24 @@
 ﻿from __future__ import annotations
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 
 import fitz  # PyMuPDF
-from pinecone import Pinecone, ServerlessSpec
+import numpy as np
 import config.env_loader
-from ml.embedder import embed_texts_robust
+from pipelines.pdf_utils import PDF_LOCK, open_pdf_cached
+from ml.embed_cache import embed_texts_cached
+from rag import semantic_cache
+from rag.retriever import invalidate_query_cache
+from pipelines._pinecone_utils import INDEX_NAME, PINECONE_API_KEY, get_index, parallel_upsert
+
+try:
+    import tiktoken  # token-accurate chunking (optional)
+except Exception:
+    tiktoken = None  # type: ignore
 
-INDEX_NAME = os.getenv("PINECONE_INDEX", "fertility-rag")
 NAMESPACE  = os.getenv("CLINIC_NAMESPACE", "patient_education")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_REGION  = os.getenv("PINECONE_REGION", "us-east-1")
-
-def _ensure_index(pc: Pinecone, dim: int):
-    names = [x["name"] for x in pc.list_indexes().get("indexes", [])]
-    if INDEX_NAME not in names:
-        pc.create_index(
-            name=INDEX_NAME,
-            dimension=dim,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region=PINECONE_REGION),
-        )
 
 def _split_words(text: str, max_words=800, overlap=120) -> List[str]:
     words = text.split()
@@ -34,15 +31,44 @@ def _split_words(text: str, max_words=800, overlap=120) -> List[str]:
         i += step
     return out
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    doc = fitz.open(pdf_path)
+@lru_cache(maxsize=1)
+def _encoder():
+    """Tokenizer for the embedding model, else cl100k_base (same BPE), else None.
+
+    Older tiktoken releases don't map the model name, and offline hosts can't
+    fetch the BPE file; callers then fall back to word chunks.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model("text-embedding-3-small")
+    except Exception:
+        pass
     try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def _split_tokens(text: str, max_tokens=800, overlap=120) -> List[str]:
+    """Chunk by embedding-model tokens so no chunk overshoots the model window;
+    falls back to word chunks when no tokenizer is available."""
+    enc = _encoder()
+    if enc is None:
+        return _split_words(text, max_words=max_tokens, overlap=overlap)
+    ids = np.asarray(enc.encode(text), dtype=np.int32)
+    step = max(1, max_tokens - overlap)
+    # a window edge can split a multi-byte character; drop the partial bytes
+    # instead of embedding U+FFFD replacement characters
+    return [enc.decode(ids[i:i+max_tokens].tolist(), errors="ignore") for i in range(0, len(ids), step)]
+
+def extract_text_from_pdf(pdf_path: str, doc: fitz.Document | None = None) -> str:
+    if doc is None:
+        doc = open_pdf_cached(pdf_path)  # shared handle: don't close it
+    with PDF_LOCK:
         pages = [page.get_text("text") or "" for page in doc]
-    finally:
-        doc.close()
     return "\n".join(pages).strip()
 
-def ingest_to_pinecone(pdf_path: str, doc_type: str = "policy") -> Dict[str, Any]:
+def ingest_to_pinecone(pdf_path: str, doc_type: str = "policy", doc: fitz.Document | None = None) -> Dict[str, Any]:
     if not PINECONE_API_KEY:
         return {"mode": "skip", "reason": "PINECONE_API_KEY missing", "count": 0}
 
@@ -50,22 +76,20 @@ def ingest_to_pinecone(pdf_path: str, doc_type: str = "policy") -> Dict[str, Any
     if not p.exists():
         return {"mode": "skip", "reason": f"file not found: {pdf_path}", "count": 0}
 
-    text = extract_text_from_pdf(str(p))
+    text = extract_text_from_pdf(str(p), doc=doc)
     if not text:
         return {"mode": "skip", "reason": "no extractable text", "count": 0, "namespace": NAMESPACE}
 
-    chunks = _split_words(text)
+    chunks = _split_tokens(text)
     if not chunks:
         return {"mode": "skip", "reason": "no chunks after split", "count": 0, "namespace": NAMESPACE}
 
-    # ⬇️ robust embedding (OpenAI → SBERT → hash)
-    vectors, dim, backend = embed_texts_robust(chunks)
-    if not vectors:
+    # ⬇️ robust embedding (OpenAI → SBERT → hash), cached per text
+    vectors, dim, backend = embed_texts_cached(chunks)
+    if len(vectors) == 0:
         return {"mode": "skip", "reason": "embedding returned empty", "backend": backend, "count": 0, "namespace": NAMESPACE}
 
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    _ensure_index(pc, dim)
-    index = pc.Index(INDEX_NAME)
+    index = get_index(dim)
 
     upserts = []
     stem = p.stem
@@ -83,7 +107,9 @@ def ingest_to_pinecone(pdf_path: str, doc_type: str = "policy") -> Dict[str, Any
             }
         })
 
-    index.upsert(vectors=upserts, namespace=NAMESPACE)
+    parallel_upsert(index, upserts, namespace=NAMESPACE)
+    semantic_cache.invalidate(namespace=NAMESPACE)
+    invalidate_query_cache(NAMESPACE)
     return {"mode": "pinecone", "count": len(upserts), "namespace": NAMESPACE, "index": INDEX_NAME, "dim": dim, "backend": backend}
 
 
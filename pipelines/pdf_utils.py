@@ -0,0 +1,105 @@
+# pipelines/pdf_utils.py
+from __future__ import annotations
+import multiprocessing, os, threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+try:
+    import fitz  # PyMuPDF
+except Exception:
+    fitz = None  # type: ignore
+
+# Cached documents are shared between callers and PyMuPDF is not thread-safe:
+# hold PDF_LOCK while reading from a handle returned by open_pdf_cached.
+PDF_LOCK = threading.RLock()
+
+@lru_cache(maxsize=8)
+def _open(path: str, mtime: float):
+    return fitz.open(path)
+
+def open_pdf_cached(path: Union[str, Path]):
+    """
+    Open a PDF once per (path, mtime) so the text (ingest) and raster (detector)
+    paths share one parsed fitz.Document. Callers must not close the handle.
+    """
+    if fitz is None:
+        raise RuntimeError("PyMuPDF (fitz) is required for PDF input. `pip install pymupdf`")
+    p = str(Path(path).resolve())
+    return _open(p, os.stat(p).st_mtime)
+
+# --------------- Rasterizing ---------------
+# Rendering holds the GIL, so larger PDFs are split across worker processes.
+# Workers import only this module (spawn context: no forked Streamlit threads,
+# no cv2/YOLO re-import) and return a few pages per task; at most one task per
+# worker is in flight, so resident pages stay ~RENDER_WORKERS * RENDER_CHUNK.
+RENDER_WORKERS = min(os.cpu_count() or 1, 4)
+RENDER_CHUNK = 2            # pages per worker task
+PARALLEL_MIN_PAGES = 8      # below this, spawn start-up costs more than it saves
+
+def render_page(page, dpi: int) -> np.ndarray:
+    """One fitz page -> HxWx3 uint8 RGB array."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+
+def render_range(pdf_path: str, dpi: int, start: int, end: int) -> List[np.ndarray]:
+    """Worker task: pages [start, end) from a private document handle."""
+    with fitz.open(pdf_path) as doc:
+        return [render_page(doc[i], dpi) for i in range(start, end)]
+
+def iter_pdf_pages(pdf_path: Union[str, Path], dpi: int, doc=None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (page_index, RGB array) in page order as pages are rendered."""
+    if doc is None:
+        doc = open_pdf_cached(pdf_path)
+    with PDF_LOCK:
+        page_count = doc.page_count
+
+    def _local(start: int, end: int) -> List[np.ndarray]:
+        with PDF_LOCK:
+            return [render_page(doc[i], dpi) for i in range(start, end)]
+
+    todo = deque((s, min(s + RENDER_CHUNK, page_count)) for s in range(0, page_count, RENDER_CHUNK))
+    pool = None
+    if page_count >= PARALLEL_MIN_PAGES and RENDER_WORKERS > 1:
+        try:
+            pool = ProcessPoolExecutor(RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, RuntimeError, ValueError):  # no process support (sandboxed hosts)
+            pool = None
+    if pool is None:
+        for s, e in todo:
+            for j, arr in enumerate(_local(s, e)):
+                yield s + j, arr
+        return
+
+    with pool:
+        pending: deque = deque()
+        broken = False
+
+        def _fill():
+            nonlocal broken
+            while not broken and todo and len(pending) < RENDER_WORKERS:
+                b = todo.popleft()
+                try:
+                    pending.append((b, pool.submit(render_range, str(pdf_path), dpi, *b)))
+                except (OSError, RuntimeError):
+                    broken = True
+                    todo.appendleft(b)
+
+        _fill()
+        while pending:
+            (s, e), fut = pending.popleft()
+            try:
+                arrs = fut.result()
+            except (OSError, RuntimeError):  # worker died (BrokenProcessPool is a RuntimeError)
+                broken = True
+                arrs = _local(s, e)
+            _fill()  # keep workers busy while the caller consumes these pages
+            for j, arr in enumerate(arrs):
+                yield s + j, arr
+        for s, e in todo:  # left over only if the pool broke
+            for j, arr in enumerate(_local(s, e)):
+                yield s + j, arr
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple
 
 import config.env_loader  # ensure .env is loaded before reading env vars
 from rag.retriever import query_pinecone
+from rag import semantic_cache
 
 # OpenAI SDK (>=1.0)
 try:
@@ -39,9 +42,12 @@ def _oai() -> OpenAI:
     return OpenAI(api_key=key)
 
 
+@lru_cache(maxsize=1024)
 def _embed(question: str) -> List[float]:
     """
     Embed the question once using text-embedding-3-small (1536 dims).
+    Memoized per process: a repeated question skips the OpenAI round-trip
+    (~6 MB at full size). Callers must not mutate the returned list.
     """
     client = _oai()
     r = client.embeddings.create(model="text-embedding-3-small", input=[question])
@@ -49,6 +55,9 @@ def _embed(question: str) -> List[float]:
 
 
 #  Context collectors 
+# every metadata key _meta_to_text can read; retrieval drops the rest
+_META_FIELDS = ["text", "chunk", "content", "snippet", "body", "title", "source", "label"]
+
 def _meta_to_text(m: Dict[str, Any]) -> str:
     """
     Defensive extraction of a displayable text from Pinecone metadata.
@@ -103,7 +112,7 @@ def answer_hybrid_with_diagnostics(
 
     Strict precedence:
       1) Patient Pinecone (namespace=f"patient:{patient_id}")
-      2) Clinic KB Pinecone (namespace=clinic_namespace, pii=False)
+      2) Clinic KB Pinecone (namespace=clinic_namespace; KB-only, so no pii filter)
       3) Manifest OCR block (from the passed manifest)
       4) If none present → general OpenAI guidance (clearly labeled)
 
@@ -116,14 +125,28 @@ def answer_hybrid_with_diagnostics(
         # If embeddings cannot run, surface the reason clearly.
         return f"OpenAI embeddings error: {e}", {"error": str(e)}
 
-    # 2) Retrieve in the two Pinecone namespaces
-    patient_hits: List[Dict[str, Any]] = []
-    if patient_id:
-        patient_hits = query_pinecone(qv, k=8, namespace=f"patient:{patient_id}", filters={}) or []
-
-    clinic_hits = query_pinecone(
-        qv, k=8, namespace=clinic_namespace, filters={"pii": {"$eq": False}}
-    ) or []
+    # Near-duplicate of a recent question for the same namespace/manifest → reuse it
+    # (same question text only, when a patient is set)
+    cache_key = semantic_cache.make_key(patient_id, clinic_namespace, model,
+                                        semantic_cache.manifest_id(manifest))
+    cached = semantic_cache.lookup(cache_key, qv, question)
+    if cached:
+        answer, diag = cached
+        return answer, {**diag, "cache": "hit"}
+
+    # 2) Retrieve in the two Pinecone namespaces concurrently (independent round-trips).
+    # The clinic namespace only ever receives KB chunks (patient data lives under
+    # patient:<id>), so no per-vector metadata filter is needed.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        patient_fut = (
+            pool.submit(query_pinecone, qv, k=8, namespace=f"patient:{patient_id}", filters={},
+                        metadata_fields=_META_FIELDS)
+            if patient_id else None
+        )
+        clinic_fut = pool.submit(query_pinecone, qv, k=8, namespace=clinic_namespace, filters={},
+                                 metadata_fields=_META_FIELDS)
+        patient_hits: List[Dict[str, Any]] = (patient_fut.result() if patient_fut else None) or []
+        clinic_hits = clinic_fut.result() or []
 
     manifest_ctx = _collect_manifest_text(manifest)
 
@@ -181,4 +204,5 @@ def answer_hybrid_with_diagnostics(
         "used_manifest": bool(manifest_ctx) if not (ptexts or ktexts) else False,
         "fallback_general": not (ptexts or ktexts or manifest_ctx),
     }
+    semantic_cache.store(cache_key, qv, question, answer, diag)  # error replies returned above
     return answer, diag
@@ -1,32 +1,182 @@
-﻿import os, json, math
+﻿import os, json, threading, time
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
 import config.env_loader
 
+try:
+    import orjson  # faster JSONL parse (optional)
+except Exception:
+    orjson = None  # type: ignore
+
+if orjson is not None:
+    _loads = orjson.loads
+else:
+    _DEC = json.JSONDecoder()
+
+    def _loads(line: bytes):
+        # one JSON value per line: skip json.loads' encoding sniff and trailing-data scan
+        return _DEC.raw_decode(line.decode("utf-8").lstrip())[0]
+
+STUB_DIR = Path("storage/pinecone_stub")
+# opt-in: scan int8-quantized rows (4x less memory traffic, ~1e-2 score error)
+STUB_INT8 = os.getenv("STUB_INT8", "0") == "1"
+
+# namespace -> (mtime_ns, size, unit-row matrix, metadata); rebuilt when the stub file changes
+_NS_CACHE: Dict[str, Tuple[int, int, np.ndarray, List[Dict[str, Any]]]] = {}
+_NS_LOCK = threading.Lock()
+
+# Pinecone query cache: entries expire after QUERY_CACHE_TTL_S, and ingest
+# retires a namespace's entries (or all, namespace=None) via invalidate_query_cache
+QUERY_CACHE_TTL_S = int(os.getenv("QUERY_CACHE_TTL_S", "600"))
+_QUERY_GEN: Dict[Optional[str], int] = {}
+_QUERY_GEN_LOCK = threading.Lock()
+
+def invalidate_query_cache(namespace: Optional[str] = None) -> None:
+    """Retire cached Pinecone matches for namespace (every namespace when None)."""
+    with _QUERY_GEN_LOCK:
+        _QUERY_GEN[namespace] = _QUERY_GEN.get(namespace, 0) + 1
+
+def _query_generation(namespace: str) -> Tuple[int, int, int]:
+    # (global bumps, this namespace's bumps, TTL window): any change is a new key
+    return (_QUERY_GEN.get(None, 0), _QUERY_GEN.get(namespace, 0),
+            int(time.time() // max(1, QUERY_CACHE_TTL_S)))
+
+def _sidecar_paths(path: Path) -> Tuple[Path, Path]:
+    """<ns>.vecs.npy + <ns>.meta.jsonl next to the stub's <ns>.jsonl."""
+    return path.with_name(f"{path.stem}.vecs.npy"), path.with_name(f"{path.stem}.meta.jsonl")
+
+def _quantize(M: np.ndarray) -> np.ndarray:
+    """Unit rows -> int8 with scale 127."""
+    return np.round(np.asarray(M) * 127).astype(np.int8)
+
+def _parse_jsonl(path: Path) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    # stream line by line straight into a preallocated [N, D] float32 matrix,
+    # so neither the file text nor every parsed vector is held at once
+    with path.open("rb") as fh:
+        n = sum(1 for line in fh if line.strip())
+    M: Optional[np.ndarray] = None
+    metas: List[Dict[str, Any]] = []
+    with path.open("rb") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            obj = _loads(line)
+            if M is None:
+                M = np.empty((n, len(obj["values"])), dtype=np.float32)
+            M[len(metas)] = obj["values"]
+            metas.append(obj["metadata"])
+    if M is None:
+        return np.zeros((0, 0), dtype=np.float32), metas
+    # unit rows -> cosine scores in a single matvec
+    norms = np.sqrt(np.einsum("ij,ij->i", M, M))
+    nz = norms > 0
+    M[nz] /= norms[nz, None]
+    return M, metas
+
+def build_sidecar(path: Union[str, Path]) -> Dict[str, Any]:
+    """Write the .npy sidecar for a stub <ns>.jsonl: unit float32 N x D rows,
+    their int8 copy, and the metadata as JSONL (see pipelines/build_stub_sidecar.py)."""
+    path = Path(path)
+    M, metas = _parse_jsonl(path)
+    vecs_path, meta_path = _sidecar_paths(path)
+    meta_path.write_text("".join(json.dumps(m, ensure_ascii=False) + "\n" for m in metas), encoding="utf-8")
+    np.save(vecs_path.with_suffix(".i8.npy"), _quantize(M))
+    np.save(vecs_path, M)  # written last: its mtime marks the sidecar as fresh
+    return {"namespace": path.stem, "count": len(metas), "dim": int(M.shape[1]) if M.ndim == 2 else 0}
+
+def _load_namespace(namespace: str, path: Path) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    # sidecars come from build_sidecar; one older than the
+    # .jsonl it was built from is stale and ignored
+    vecs_path, meta_path = _sidecar_paths(path)
+    st = path.stat()
+    use_npy = vecs_path.exists() and meta_path.exists() and vecs_path.stat().st_mtime_ns >= st.st_mtime_ns
+    if use_npy:
+        st = vecs_path.stat()
+    with _NS_LOCK:
+        hit = _NS_CACHE.get(namespace)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            return hit[2], hit[3]
+        if use_npy:
+            # mmap: pages come from the OS page cache, shared across processes
+            i8_path = vecs_path.with_suffix(".i8.npy")
+            M = np.load(i8_path if STUB_INT8 and i8_path.exists() else vecs_path, mmap_mode="r")
+            metas = [_loads(line) for line in meta_path.read_bytes().splitlines() if line.strip()]
+        else:
+            M, metas = _parse_jsonl(path)
+        if STUB_INT8 and M.dtype != np.int8:
+            M = _quantize(M)
+        _NS_CACHE[namespace] = (st.st_mtime_ns, st.st_size, M, metas)
+        return M, metas
+
 def _fallback_local(namespace: str, query_vec: List[float], k: int):
-    path = Path("storage/pinecone_stub") / f"{namespace}.jsonl"
+    path = STUB_DIR / f"{namespace}.jsonl"
     if not path.exists(): return []
-    vecs = [json.loads(line) for line in path.read_text().splitlines()]
-    def cos(a,b):
-        s = sum(x*y for x,y in zip(a,b))
-        na = math.sqrt(sum(x*x for x in a)); nb = math.sqrt(sum(x*x for x in b))
-        return 0.0 if na==0 or nb==0 else s/(na*nb)
-    scored = sorted([(cos(query_vec, v["values"]), v) for v in vecs], key=lambda x: x[0], reverse=True)
-    return [{"score": s, "metadata": v["metadata"]} for s, v in scored[:k]]
+    M, metas = _load_namespace(namespace, path)
+    if not metas or k <= 0: return []
+    q = np.asarray(query_vec, dtype=np.float32)
+    if q.shape != (M.shape[1],):
+        return []  # another embedding model's vectors: not comparable (no zip-truncated scores)
+    qn = float(np.sqrt(np.vdot(q, q))) or 1.0
+    # rows are unit-norm already and the query scale is the same for every row,
+    # so rank on raw dot products and rescale only the k winners to cosine
+    if M.dtype == np.int8:
+        scores = np.einsum("ij,j->i", M, _quantize(q / qn), dtype=np.int32)  # int32 accumulation
+        scale = 1.0 / (127.0 * 127.0)
+    else:
+        scores = M @ q
+        scale = 1.0 / qn
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return [{"score": float(scores[i]) * scale, "metadata": metas[i]} for i in idx]
+
+def _project(md: Dict[str, Any], fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Keep only the requested metadata keys (those present); None keeps everything."""
+    if fields is None or not isinstance(md, dict):
+        return md
+    return {f: md[f] for f in fields if f in md}
+
+@lru_cache(maxsize=512)
+def _cached_query(vec_bytes: bytes, k: int, namespace: str, filters_key: str,
+                  api_key: str, index_name: str, generation: Tuple[int, int, int],
+                  fields: Optional[Tuple[str, ...]] = None):
+    """Pinecone matches for one (query vector, k, namespace, filters); errors are not cached.
+
+    generation comes from _query_generation, so entries last at most one TTL
+    window and are retired as soon as ingest invalidates their namespace.
+    """
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=api_key)
+    res = pc.Index(index_name).query(
+        vector=np.frombuffer(vec_bytes, dtype=np.float32).tolist(), top_k=k, namespace=namespace,
+        include_metadata=True, filter=json.loads(filters_key)
+    )
+    return tuple({"score": m["score"], "metadata": _project(m["metadata"], fields)} for m in res["matches"])
 
 def query_pinecone(query_vec: List[float], k: int = 8, namespace: str = "patient_education",
-                   filters: Optional[Dict[str, Any]] = None):
+                   filters: Optional[Dict[str, Any]] = None,
+                   metadata_fields: Optional[List[str]] = None):
+    """
+    Top-k matches as [{"score", "metadata"}]. metadata_fields, when given, trims
+    each match's metadata to those keys (Pinecone itself only returns all or none),
+    so cached entries and downstream dicts carry just what the caller reads.
+    """
     api_key = os.getenv("PINECONE_API_KEY")
     index_name = os.getenv("PINECONE_INDEX", "fertility-rag")
+    fields = tuple(metadata_fields) if metadata_fields is not None else None
+
+    def _local():
+        return [{"score": h["score"], "metadata": _project(h["metadata"], fields)}
+                for h in _fallback_local(namespace, query_vec, k)]
+
     if not api_key:
-        return _fallback_local(namespace, query_vec, k)
+        return _local()
     try:
-        from pinecone import Pinecone
-        pc = Pinecone(api_key=api_key)
-        res = pc.Index(index_name).query(
-            vector=query_vec, top_k=k, namespace=namespace,
-            include_metadata=True, filter=filters or {}
-        )
-        return [{"score": m["score"], "metadata": m["metadata"]} for m in res["matches"]]
+        hits = _cached_query(np.asarray(query_vec, dtype=np.float32).tobytes(), k, namespace,
+                             json.dumps(filters or {}, sort_keys=True), api_key, index_name,
+                             _query_generation(namespace), fields)
+        return [dict(h) for h in hits]  # callers may annotate results
     except Exception:
-        return _fallback_local(namespace, query_vec, k)
+        return _local()
@@ -0,0 +1,98 @@
+# rag/semantic_cache.py
+"""
+Semantic answer cache for rag.qa: a question whose embedding is within
+SIM_THRESHOLD cosine of an earlier one (same namespace, model and manifest)
+reuses that answer instead of re-running retrieval + chat completion.
+
+Patient-scoped keys only reuse an answer for the same normalized question
+text: "what is my AMH level" and "what is my FSH level" embed ~0.95 apart
+but must not share an answer.
+
+In-process numpy matrices, one per key; entries expire after TTL_S. Ingest
+pipelines call invalidate() when the underlying Pinecone data changes.
+"""
+from __future__ import annotations
+import os, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SIM_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_SIM", "0.95"))
+TTL_S = int(os.getenv("SEMANTIC_CACHE_TTL_S", str(24 * 3600)))
+MAX_PER_KEY = 10_000
+
+Key = Tuple[str, str, str, str]  # (patient_id or "none", clinic_namespace, model, manifest_id)
+
+class _Bucket:
+    def __init__(self, dim: int):
+        self.vecs = np.empty((0, dim), dtype=np.float32)   # unit-normalized rows
+        self.cached_at = np.empty((0,), dtype=np.float64)
+        self.texts: List[str] = []                           # normalized questions
+        self.values: List[Tuple[str, Dict[str, Any]]] = []
+
+_buckets: Dict[Key, _Bucket] = {}
+_lock = threading.Lock()
+
+def make_key(patient_id: Optional[str], clinic_namespace: str, model: str,
+             manifest_id: str = "") -> Key:
+    """manifest_id identifies the manifest the answer may draw on (see manifest_id())."""
+    return (patient_id or "none", clinic_namespace, model, manifest_id)
+
+def manifest_id(manifest: Optional[Dict[str, Any]]) -> str:
+    """'<path>@<mtime_ns>' of a detector manifest, so a re-run retires its answers."""
+    path = (manifest or {}).get("manifest")
+    if not path:
+        return ""
+    try:
+        return f"{path}@{os.stat(path).st_mtime_ns}"
+    except OSError:
+        return str(path)
+
+def _norm_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.sqrt(np.vdot(v, v)))
+    return v / n if n else v
+
+def lookup(key: Key, qvec, question: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Cached (answer, diag) for the closest fresh question above SIM_THRESHOLD
+    (patient keys: the fresh entry with the same normalized text)."""
+    q = _unit(qvec)
+    with _lock:
+        b = _buckets.get(key)
+        if b is None or not b.values or b.vecs.shape[1] != q.shape[0]:
+            return None
+        if key[0] != "none":
+            text = _norm_text(question)
+            sims = np.asarray([1.0 if t == text else -1.0 for t in b.texts])
+        else:
+            sims = b.vecs @ q
+        sims[b.cached_at < time.time() - TTL_S] = -1.0  # expired
+        i = int(np.argmax(sims))
+        if sims[i] < SIM_THRESHOLD:
+            return None
+        return b.values[i]
+
+def store(key: Key, qvec, question: str, answer: str, diag: Dict[str, Any]) -> None:
+    """Cache a successful answer; callers must not store error replies."""
+    q = _unit(qvec)
+    with _lock:
+        b = _buckets.get(key)
+        if b is None or b.vecs.shape[1] != q.shape[0]:
+            b = _buckets[key] = _Bucket(q.shape[0])
+        keep = b.cached_at >= time.time() - TTL_S
+        if len(b.values) >= MAX_PER_KEY:
+            keep[: len(b.values) - MAX_PER_KEY + 1] = False  # oldest first
+        b.vecs = np.vstack([b.vecs[keep], q[None, :]])
+        b.cached_at = np.append(b.cached_at[keep], time.time())
+        b.texts = [t for t, k in zip(b.texts, keep) if k] + [_norm_text(question)]
+        b.values = [v for v, k in zip(b.values, keep) if k] + [(answer, diag)]
+
+def invalidate(patient_id: Optional[str] = None, namespace: Optional[str] = None) -> None:
+    """Drop answers grounded on a patient's data or a clinic namespace that just changed."""
+    with _lock:
+        for key in list(_buckets):
+            if (patient_id and key[0] == patient_id) or (namespace and key[1] == namespace):
+                del _buckets[key]
@@ -0,0 +1,94 @@
+# storage/_pool.py
+"""
+Per-thread SQLite connections shared by clinic_db / embryology_db / registry.
+
+Each thread keeps one open connection per database file (WAL, relaxed fsync),
+so helpers no longer pay connect on every call; schema migration runs only
+for the first connection to each file in the process. Streamlit starts a
+fresh ScriptRunner thread for every rerun, so a thread's connections are
+closed when that thread's locals are freed instead of leaking one handle
+per rerun. Connections are never shared across live threads.
+"""
+from __future__ import annotations
+import os, sqlite3, threading, weakref
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+_local = threading.local()
+
+class _Holder:
+    """Per-thread owner of the connection map; its finalizer closes them on thread exit."""
+    __slots__ = ("conns", "__weakref__")
+
+    def __init__(self) -> None:
+        self.conns: Dict[str, sqlite3.Connection] = {}
+
+def _close_all(conns: Dict[str, sqlite3.Connection]) -> None:
+    for c in conns.values():
+        try:
+            c.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
+
+def _thread_conns() -> Dict[str, sqlite3.Connection]:
+    h = getattr(_local, "holder", None)
+    if h is None:
+        h = _local.holder = _Holder()
+        # the finalizer references only the dict, so the holder dies with the thread
+        weakref.finalize(h, _close_all, h.conns)
+    return h.conns
+
+def _connect(target: str, **kw) -> sqlite3.Connection:
+    # check_same_thread=False only so the finalizer may close the handle from
+    # whichever thread tears down the dead thread's locals; use stays per-thread
+    c = sqlite3.connect(target, check_same_thread=False, **kw)
+    c.row_factory = sqlite3.Row
+    return c
+# abs paths whose schema this process has already migrated; later threads skip it
+_MIGRATED: Set[str] = set()
+_migrate_lock = threading.Lock()
+
+def get_conn(db_path: str | Path,
+             migrate: Optional[Callable[[sqlite3.Connection], None]] = None) -> sqlite3.Connection:
+    """This thread's connection to db_path; opened on first use, migrated once per process."""
+    key = os.path.abspath(db_path)  # DB paths are cwd-relative
+    conns = _thread_conns()
+    c = conns.get(key)
+    if c is None:
+        c = _connect(key)
+        for p in PRAGMAS:
+            c.execute(p)
+        if migrate is not None and key not in _MIGRATED:
+            with _migrate_lock:
+                if key not in _MIGRATED:
+                    migrate(c)
+                    _MIGRATED.add(key)
+        conns[key] = c
+    return c
+
+def get_ro_conn(db_path: str | Path,
+                migrate: Optional[Callable[[sqlite3.Connection], None]] = None) -> sqlite3.Connection:
+    """This thread's read-only connection to db_path, for pure-read helpers.
+
+    Under WAL these readers never wait on (or block) the single writer. The
+    file is created and migrated through get_conn first, since mode=ro can't.
+    """
+    key = os.path.abspath(db_path)
+    conns = _thread_conns()
+    c = conns.get(key + "?ro")
+    if c is None:
+        if key not in _MIGRATED or not os.path.exists(key):
+            get_conn(db_path, migrate)
+        c = _connect(Path(key).as_uri() + "?mode=ro", uri=True)
+        for p in PRAGMAS[2:]:  # journal_mode/synchronous only matter to writers
+            c.execute(p)
+        conns[key + "?ro"] = c
+    return c
@@ -4,16 +4,21 @@ import sqlite3, time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+from storage._pool import get_conn, get_ro_conn
+
 DB = Path("storage/clinic.db")
 DB.parent.mkdir(parents=True, exist_ok=True)
+SCHEMA_VERSION = 1  # bump when _migrate changes
 
 def _conn():
-    c = sqlite3.connect(DB)
-    c.row_factory = sqlite3.Row
-    _migrate(c)
-    return c
+    return get_conn(DB, _migrate)
+
+def _ro():
+    return get_ro_conn(DB, _migrate)
 
 def _migrate(c: sqlite3.Connection):
+    if c.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
     # appointments
     c.execute("""CREATE TABLE IF NOT EXISTS appointments(
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -38,6 +43,10 @@ def _migrate(c: sqlite3.Connection):
         notes TEXT,
         ts INTEGER DEFAULT (strftime('%s','now'))
     )""")
+    # every lookup filters by patient and orders by time
+    c.execute("CREATE INDEX IF NOT EXISTS idx_appt_pid_time ON appointments(patient_id, appt_time)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_treat_pid_ts ON treatments(patient_id, ts DESC)")
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     c.commit()
 
 # -------- Appointments --------
@@ -49,7 +58,7 @@ def create_appointment(patient_id: str, appt_time_utc: int, tz: str = "UTC",
         (patient_id, appt_time, tz, appt_type, clinician, notes, status)
         VALUES (?,?,?,?,?,?,?)""",
         (patient_id, appt_time_utc, tz, appt_type, clinician, notes, status))
-    c.commit(); appt_id = cur.lastrowid; c.close()
+    c.commit(); appt_id = cur.lastrowid
     return appt_id
 
 def list_appointments(patient_id: str, from_utc: Optional[int]=None, to_utc: Optional[int]=None,
@@ -59,20 +68,19 @@ def list_appointments(patient_id: str, from_utc: Optional[int]=None, to_utc: Opt
     if from_utc is not None: q += " AND appt_time>=?"; params.append(from_utc)
     if to_utc   is not None: q += " AND appt_time<=?"; params.append(to_utc)
     q += " ORDER BY appt_time ASC LIMIT ?"; params.append(limit)
-    c = _conn(); rows = [dict(r) for r in c.execute(q, params).fetchall()]; c.close()
+    c = _ro(); rows = [dict(r) for r in c.execute(q, params).fetchall()]
     return rows
 
 def cancel_appointment(appt_id: int) -> bool:
     c = _conn(); c.execute("UPDATE appointments SET status='cancelled' WHERE id=?", (appt_id,))
-    c.commit(); c.close(); return True
+    c.commit(); return True
 
 def next_appointment(patient_id: str, now_utc: Optional[int]=None) -> Dict[str,Any] | None:
     now_utc = now_utc or int(time.time())
-    c = _conn()
+    c = _ro()
     r = c.execute("""SELECT * FROM appointments
                      WHERE patient_id=? AND appt_time>=? AND status='scheduled'
                      ORDER BY appt_time ASC LIMIT 1""", (patient_id, now_utc)).fetchone()
-    c.close()
     return dict(r) if r else None
 
 # -------- Treatments --------
@@ -95,17 +103,43 @@ def upsert_treatment(patient_id: str, regimen: str, protocol: str = "",
             VALUES (?,?,?,?,?,?,?)""",
             (patient_id, regimen, protocol, start_ts, end_ts, status, notes))
         tid = cur.lastrowid
-    c.commit(); c.close(); return tid
+    c.commit(); return tid
 
 def get_treatment(patient_id: str) -> Dict[str,Any] | None:
-    c = _conn()
+    c = _ro()
     r = c.execute("""SELECT * FROM treatments WHERE patient_id=?
                      ORDER BY ts DESC LIMIT 1""", (patient_id,)).fetchone()
-    c.close()
     return dict(r) if r else None
 
 def list_treatments(patient_id: str, limit: int = 10) -> List[Dict[str,Any]]:
-    c = _conn()
+    c = _ro()
     rows = [dict(r) for r in c.execute("""SELECT * FROM treatments
                    WHERE patient_id=? ORDER BY ts DESC LIMIT ?""", (patient_id, limit)).fetchall()]
-    c.close(); return rows
+    return rows
+
+# -------- Patient view --------
+def snapshot(patient_id: str, now_utc: Optional[int]=None, limit: int = 20,
+             history_limit: int = 10) -> Dict[str,Any]:
+    """Upcoming/next appointments + current/past treatments in one read transaction."""
+    now_utc = now_utc or int(time.time())
+    c = _ro()
+    c.execute("BEGIN")  # one consistent read snapshot for all four SELECTs
+    try:
+        upcoming = [dict(r) for r in c.execute("""SELECT * FROM appointments
+                        WHERE patient_id=? AND appt_time>=? ORDER BY appt_time ASC LIMIT ?""",
+                        (patient_id, now_utc, limit)).fetchall()]
+        nxt = c.execute("""SELECT * FROM appointments
+                           WHERE patient_id=? AND appt_time>=? AND status='scheduled'
+                           ORDER BY appt_time ASC LIMIT 1""", (patient_id, now_utc)).fetchone()
+        tx = c.execute("""SELECT * FROM treatments WHERE patient_id=?
+                          ORDER BY ts DESC LIMIT 1""", (patient_id,)).fetchone()
+        history = [dict(r) for r in c.execute("""SELECT * FROM treatments
+                       WHERE patient_id=? ORDER BY ts DESC LIMIT ?""", (patient_id, history_limit)).fetchall()]
+    finally:
+        c.commit()
+    return {
+        "next": dict(nxt) if nxt else None,
+        "upcoming": upcoming,
+        "treatment": dict(tx) if tx else None,
+        "treatments": history,
+    }
@@ -4,16 +4,26 @@ import json, sqlite3, time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from storage._pool import get_conn, get_ro_conn
+
+try:
+    import orjson  # faster details_json serialize (optional)
+except Exception:
+    orjson = None  # type: ignore
+
 DB = Path("storage/embryology.db")
 DB.parent.mkdir(parents=True, exist_ok=True)
+SCHEMA_VERSION = 1  # bump when _migrate changes
 
 def _conn():
-    c = sqlite3.connect(DB)
-    c.row_factory = sqlite3.Row
-    _migrate(c)
-    return c
+    return get_conn(DB, _migrate)
+
+def _ro():
+    return get_ro_conn(DB, _migrate)
 
 def _migrate(c: sqlite3.Connection):
+    if c.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
     c.execute("""CREATE TABLE IF NOT EXISTS updates(
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         patient_id TEXT NOT NULL,
@@ -27,34 +37,56 @@ def _migrate(c: sqlite3.Connection):
         details_json TEXT,              -- JSON blob for per-embryo details if needed
         ts INTEGER DEFAULT (strftime('%s','now'))
     )""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_upd_pid_day_ts ON updates(patient_id, day, ts)")
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     c.commit()
 
+_INSERT_UPDATE = """INSERT INTO updates
+        (patient_id, day, date_utc, stage, total, good, grades, notes, details_json)
+        VALUES (?,?,?,?,?,?,?,?,?)"""
+
+def _details_json(details: Dict[str, Any] | None) -> str:
+    details = details or {}
+    if orjson is not None:
+        try:
+            out = orjson.dumps(details, option=orjson.OPT_NON_STR_KEYS).decode()  # UTF-8, like ensure_ascii=False
+        except TypeError:
+            out = None  # a type orjson can't encode; json decides as before
+        # orjson writes NaN/Infinity as null; let json keep them as before
+        if out is not None and "null" not in out:
+            return out
+    return json.dumps(details, ensure_ascii=False)
+
 def add_update(patient_id: str, day: int, date_utc: int, stage: str,
                total: int, good: int, grades: str, notes: str,
                details: Dict[str, Any] | None = None) -> int:
-    details_json = json.dumps(details or {}, ensure_ascii=False)
     c = _conn()
-    cur = c.execute("""INSERT INTO updates
-        (patient_id, day, date_utc, stage, total, good, grades, notes, details_json)
-        VALUES (?,?,?,?,?,?,?,?,?)""",
-        (patient_id, day, date_utc, stage, total, good, grades, notes, details_json))
-    c.commit(); uid = cur.lastrowid; c.close()
+    cur = c.execute(_INSERT_UPDATE,
+        (patient_id, day, date_utc, stage, total, good, grades, notes, _details_json(details)))
+    c.commit(); uid = cur.lastrowid
     return uid
 
-def list_updates(patient_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+def add_updates_bulk(items: List[Dict[str, Any]]) -> int:
+    """Insert many updates (dicts with add_update's argument names) in one transaction."""
+    rows = [(i["patient_id"], i["day"], i["date_utc"], i["stage"], i["total"], i["good"],
+             i["grades"], i["notes"], _details_json(i.get("details"))) for i in items]
     c = _conn()
+    with c:  # single COMMIT (one fsync) for the whole batch; rolls back on error
+        c.executemany(_INSERT_UPDATE, rows)
+    return len(rows)
+
+def list_updates(patient_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    c = _ro()
     rows = [dict(r) for r in c.execute(
         "SELECT * FROM updates WHERE patient_id=? ORDER BY day ASC, ts ASC LIMIT ?",
         (patient_id, limit)
     ).fetchall()]
-    c.close()
     return rows
 
 def latest_update(patient_id: str) -> Dict[str, Any] | None:
-    c = _conn()
+    c = _ro()
     r = c.execute(
         "SELECT * FROM updates WHERE patient_id=? ORDER BY day DESC, ts DESC LIMIT 1",
         (patient_id,)
     ).fetchone()
-    c.close()
     return dict(r) if r else None
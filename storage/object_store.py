@@ -2,15 +2,31 @@
 import os
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from requests_toolbelt import MultipartEncoder  # streamed multipart (optional)
+except Exception:
+    MultipartEncoder = None  # type: ignore
 
 FILE_SHARING_BACKEND = os.getenv("FILE_SHARING_BACKEND", "fileio").lower()  # "fileio" | "transfer"
 FILEIO_ENDPOINT = os.getenv("FILEIO_ENDPOINT", "https://file.io").rstrip("/")
 FILEIO_EXPIRES  = os.getenv("FILEIO_EXPIRES", "14d")
 FILEIO_MAX_DL   = os.getenv("FILEIO_MAX_DOWNLOADS")
 TRANSFER_ENDPOINT = os.getenv("TRANSFER_ENDPOINT", "https://transfer.sh").rstrip("/")
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
+
+_URL_IN_BODY = re.compile(r"https?://[^\s\"'>]+")
+_URL_PREFIX = re.compile(r"^https?://")
+
+# keep-alive pool shared by the upload workers; retries stay in _with_retries
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=UPLOAD_WORKERS))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=UPLOAD_WORKERS))
 
 def _sleep_backoff(attempt: int):
     time.sleep(min(0.5 * (2 ** attempt), 4.0))
@@ -24,8 +40,13 @@ def _upload_fileio_one(local_path: str, expires: str | None, max_dl: str | None,
     if expires: params["expires"] = expires
     if max_dl:  params["maxDownloads"] = max_dl
     with open(local_path, "rb") as f:
-        files = {"file": (Path(local_path).name, f, "application/octet-stream")}
-        r = requests.post(url, params=params, files=files, timeout=timeout)
+        if MultipartEncoder is not None:
+            # streams the file from disk instead of building the whole body in memory
+            m = MultipartEncoder(fields={"file": (Path(local_path).name, f, "application/octet-stream")})
+            r = _SESSION.post(url, params=params, data=m, headers={"Content-Type": m.content_type}, timeout=timeout)
+        else:
+            files = {"file": (Path(local_path).name, f, "application/octet-stream")}
+            r = _SESSION.post(url, params=params, files=files, timeout=timeout)
     if r.status_code >= 400:
         msg = r.text.strip()[:300]
         raise RuntimeError(f"file.io HTTP {r.status_code}: {msg or 'no body'}")
@@ -43,7 +64,7 @@ def _upload_fileio_one(local_path: str, expires: str | None, max_dl: str | None,
         except Exception as e:
             raise RuntimeError(f"file.io JSON parse error: {e}; body starts: {body[:120]}")
     else:
-        m = re.search(r"https?://[^\s\"'>]+", body)
+        m = _URL_IN_BODY.search(body)
         if m:
             link = m.group(0)
 
@@ -51,37 +72,40 @@ def _upload_fileio_one(local_path: str, expires: str | None, max_dl: str | None,
         raise RuntimeError(f"file.io response missing link; content-type={ctype}; body starts: {body[:120]}")
     return link
 
+def _with_retries(upload_one, local_path: str, backend: str, attempts: int = 3) -> str:
+    last_err = None
+    for attempt in range(0, attempts):
+        try:
+            return upload_one(local_path)
+        except Exception as e:
+            last_err = e
+            _sleep_backoff(attempt)
+    raise RuntimeError(f"{backend} upload failed for {local_path}: {last_err}")
+
+def _upload_many(upload_one, local_paths: list[str], backend: str) -> dict[str, str]:
+    """Upload files concurrently (each with its own retries); keys keep input order."""
+    if not local_paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(local_paths))) as ex:
+        futs = [(lp, ex.submit(_with_retries, upload_one, lp, backend)) for lp in local_paths]
+        return {Path(lp).name: fut.result() for lp, fut in futs}
+
 def _upload_fileio(local_paths: list[str]) -> dict[str, str]:
-    out: dict[str, str] = {}
-    for lp in local_paths:
-        last_err = None
-        for attempt in range(0, 3):
-            try:
-                url = _upload_fileio_one(lp, FILEIO_EXPIRES, FILEIO_MAX_DL)
-                out[Path(lp).name] = url
-                last_err = None
-                break
-            except Exception as e:
-                last_err = e
-                _sleep_backoff(attempt)
-        if last_err:
-            raise RuntimeError(f"file.io upload failed for {lp}: {last_err}")
-    return out
+    return _upload_many(lambda lp: _upload_fileio_one(lp, FILEIO_EXPIRES, FILEIO_MAX_DL), local_paths, "file.io")
+
+def _upload_transfersh_one(local_path: str, timeout: int = 60) -> str:
+    key = f"{int(time.time())}_{Path(local_path).name}"
+    with open(local_path, "rb") as f:
+        r = _SESSION.put(f"{TRANSFER_ENDPOINT}/{key}", data=f, timeout=timeout)
+    if r.status_code >= 400:
+        raise RuntimeError(f"transfer.sh HTTP {r.status_code}: {r.text[:200]}")
+    link = r.text.strip()
+    if not _URL_PREFIX.match(link):
+        raise RuntimeError(f"transfer.sh unexpected body: {link[:120]}")
+    return link
 
 def _upload_transfersh(local_paths: list[str]) -> dict[str, str]:
-    out: dict[str, str] = {}
-    for lp in local_paths:
-        name = Path(lp).name
-        key = f"{int(time.time())}_{name}"
-        with open(lp, "rb") as f:
-            r = requests.put(f"{TRANSFER_ENDPOINT}/{key}", data=f, timeout=60)
-        if r.status_code >= 400:
-            raise RuntimeError(f"transfer.sh HTTP {r.status_code}: {r.text[:200]}")
-        link = r.text.strip()
-        if not re.match(r"^https?://", link):
-            raise RuntimeError(f"transfer.sh unexpected body: {link[:120]}")
-        out[name] = link
-    return out
+    return _upload_many(_upload_transfersh_one, local_paths, "transfer.sh")
 
 def upload_and_sign(local_paths: list[str], patient_id: str, case_id: str, expires_s: int = 86400) -> dict[str, str]:
     primary = FILE_SHARING_BACKEND
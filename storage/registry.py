@@ -4,12 +4,26 @@ import sqlite3
 import time
 import os
 
+from storage._pool import get_conn, get_ro_conn
+
 DB = Path("storage/registry.db")
 DB.parent.mkdir(parents=True, exist_ok=True)
+SCHEMA_VERSION = 1  # bump when _migrate changes
 
 def _conn():
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
+    return get_conn(DB, _migrate)
+
+def _ro():
+    return get_ro_conn(DB, _migrate)
+
+def _migrate(conn: sqlite3.Connection):
+    """Ensure the table exists and has a ts INTEGER column; backfill if missing/NULL.
+
+    Stamps PRAGMA user_version when done, so databases already at
+    SCHEMA_VERSION skip the table_info probe and backfill entirely.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
     # Ensure table exists
     conn.execute(
         """CREATE TABLE IF NOT EXISTS manifests(
@@ -19,11 +33,6 @@ def _conn():
         )"""
     )
     conn.commit()
-    _migrate(conn)
-    return conn
-
-def _migrate(conn: sqlite3.Connection):
-    """Ensure the schema has a ts INTEGER column; backfill if missing/NULL."""
     # What columns exist now?
     cols = {row[1] for row in conn.execute("PRAGMA table_info(manifests)").fetchall()}
     if "ts" not in cols:
@@ -40,6 +49,10 @@ def _migrate(conn: sqlite3.Connection):
                 mtime = int(time.time())
             conn.execute("UPDATE manifests SET ts=? WHERE rowid=?", (mtime, r["rowid"]))
         conn.commit()
+    # latest/list lookups: WHERE patient_id=? ORDER BY ts DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_man_pid_ts ON manifests(patient_id, ts DESC)")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
 
 def register_manifest(patient_id: str, manifest_path: str):
     conn = _conn()
@@ -53,24 +66,21 @@ def register_manifest(patient_id: str, manifest_path: str):
         (patient_id, manifest_path, ts),
     )
     conn.commit()
-    conn.close()
 
 def latest_manifest(patient_id: str) -> str | None:
-    conn = _conn()
+    conn = _ro()
     cur = conn.execute(
         "SELECT manifest_path FROM manifests WHERE patient_id=? ORDER BY ts DESC LIMIT 1",
         (patient_id,),
     )
     row = cur.fetchone()
-    conn.close()
     return row["manifest_path"] if row else None
 
 def list_manifests(patient_id: str, limit: int = 5):
-    conn = _conn()
+    conn = _ro()
     cur = conn.execute(
         "SELECT manifest_path, ts FROM manifests WHERE patient_id=? ORDER BY ts DESC LIMIT ?",
         (patient_id, limit),
     )
     rows = [(r["manifest_path"], r["ts"]) for r in cur.fetchall()]
-    conn.close()
     return rows
@@ -20,13 +20,14 @@ def _isolate_cwd(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     # leave OPENAI/PINECONE unset; we mock upsert
     yield
 
-@pytest.fixture
-def make_dummy_image(tmp_path: Path) -> Tuple[Path, Tuple[int,int,int,int]]:
+@pytest.fixture(scope="session")
+def make_dummy_image(tmp_path_factory: pytest.TempPathFactory) -> Tuple[Path, Tuple[int,int,int,int]]:
     """
     Create a simple image with a white rectangle that we pretend YOLO detects.
+    Written once per session; tests only read it.
     Return (image_path, bbox)
     """
-    img_path = tmp_path / "dummy.png"
+    img_path = tmp_path_factory.mktemp("img") / "dummy.png"
     W, H = 800, 600
     bbox = (200, 220, 600, 300)  # x1,y1,x2,y2
     im = Image.new("RGB", (W, H), (30, 30, 30))
@@ -4,28 +4,43 @@ from pathlib import Path
 import json
 import types
 import pytest
-from PIL import Image
 
 import pipelines.document_detector as dd
 
-def _fake_predict_one(img_pil: Image.Image):
-    # one detection, deterministic
-    W, H = img_pil.size
-    x1, y1, x2, y2 = int(W*0.25), int(H*0.4), int(W*0.75), int(H*0.5)
-    return [{"label": "AMH", "conf": 0.91, "bbox": [x1, y1, x2, y2]}]
+def _fake_predict_batch(model, imgs):
+    # one detection per page, deterministic
+    out = []
+    for img in imgs:  # HxWx3 RGB arrays
+        H, W = img.shape[:2]
+        x1, y1, x2, y2 = int(W*0.25), int(H*0.4), int(W*0.75), int(H*0.5)
+        out.append(dd._make_dets([[x1, y1, x2, y2]], [0.91], [0], {0: "AMH"}))
+    return out
 
+def _fake_image_to_data(img, config=None, output_type=None):
+    # two words inside the fake AMH box (y 240-300 on 800x600), one outside it
+    words = [("2.34", 260, 255), ("ng/mL", 330, 255), ("Header", 40, 20)]
+    return {
+        "text": [w for w, _, _ in words], "conf": [95, 93, 90],
+        "left": [x for _, x, _ in words], "top": [y for _, _, y in words],
+        "width": [60, 70, 90], "height": [24, 24, 24],
+        "block_num": [1, 1, 2], "par_num": [1, 1, 1], "line_num": [1, 1, 1],
+    }
+
+@pytest.mark.parametrize("ocr_mode", ["page", "crop"])
 @pytest.mark.parametrize("save_crops", [False, True])
-def test_detect_documents_image(monkeypatch, tmp_path, make_dummy_image, save_crops):
+def test_detect_documents_image(monkeypatch, tmp_path, make_dummy_image, save_crops, ocr_mode):
     img_path, _bbox = make_dummy_image
 
     # Monkeypatch: bypass YOLO load and prediction
     class _FakeModel: pass
     monkeypatch.setattr(dd, "_load_yolo", lambda: _FakeModel())
-    monkeypatch.setattr(dd, "_predict_one", _fake_predict_one)
+    monkeypatch.setattr(dd, "_predict_batch", _fake_predict_batch)
 
     # Monkeypatch OCR to avoid needing Tesseract
+    monkeypatch.setattr(dd, "OCR_MODE", ocr_mode)
     monkeypatch.setattr(dd, "pytesseract", types.SimpleNamespace(
-        image_to_string=lambda img, config=None: "2.34 ng/mL"
+        image_to_string=lambda img, config=None: "2.34 ng/mL",
+        image_to_data=_fake_image_to_data,
     ))
 
     out_dir = tmp_path / "storage" / "patients" / "p01"
@@ -0,0 +1,53 @@
+# tests/test_embed_cache.py
+from __future__ import annotations
+import pytest
+
+import ml.embed_cache as ec
+
+@pytest.fixture
+def fresh_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(ec, "DB_PATH", str(tmp_path / "embeds.sqlite"))
+    monkeypatch.setattr(ec, "_mem", ec.OrderedDict())
+    monkeypatch.setattr(ec, "PRIMARY_BACKEND", "fake")
+
+def _fake_embedder(calls, backend="fake"):
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts], 2, backend
+    return embed
+
+def test_only_misses_are_embedded_and_order_is_kept(fresh_cache):
+    calls = []
+    embed = _fake_embedder(calls)
+    ec.embed_texts_cached(["aa", "bbb"], embed)
+    vecs, dim, backend = ec.embed_texts_cached(["bbb", "c", "aa"], embed)
+    assert calls == [["aa", "bbb"], ["c"]]
+    assert vecs.dtype == ec.np.float32
+    assert vecs.tolist() == [[3.0, 1.0], [1.0, 1.0], [2.0, 1.0]] and dim == 2 and backend == "fake"
+
+def test_persistent_tier_survives_memory_reset(fresh_cache, monkeypatch):
+    calls = []
+    ec.embed_texts_cached(["policy text"], _fake_embedder(calls))
+    monkeypatch.setattr(ec, "_mem", ec.OrderedDict())
+    vecs, _, _ = ec.embed_texts_cached(["policy text"], _fake_embedder(calls))
+    assert len(calls) == 1 and vecs.tolist() == [[11.0, 1.0]]
+
+def test_backend_fallback_does_not_mix_vectors(fresh_cache):
+    calls = []
+    ec.embed_texts_cached(["aa"], _fake_embedder(calls, "openai"))
+    vecs, _, backend = ec.embed_texts_cached(["aa", "b"], _fake_embedder(calls, "hash"))
+    assert backend == "hash" and calls[-1] == ["aa", "b"] and len(vecs) == 2
+
+def test_fallback_vectors_are_never_served_to_the_primary(fresh_cache, monkeypatch):
+    monkeypatch.setattr(ec, "PRIMARY_BACKEND", "openai")
+    calls = []
+    ec.embed_texts_cached(["aa", "b"], _fake_embedder(calls, "hash"))  # outage
+    def openai(texts):
+        calls.append(list(texts))
+        return [[9.0, 9.0, 9.0] for _ in texts], 3, "openai"
+    vecs, dim, backend = ec.embed_texts_cached(["aa", "b"], openai)
+    assert calls[-1] == ["aa", "b"] and backend == "openai" and dim == 3
+    assert vecs.tolist() == [[9.0, 9.0, 9.0]] * 2
+    monkeypatch.setattr(ec, "_mem", ec.OrderedDict())  # as in a new process
+    ec.embed_texts_cached(["aa", "b"], openai)
+    assert len(calls) == 2  # served from the primary's persistent tier
@@ -0,0 +1,34 @@
+# tests/test_embryology_db.py
+from __future__ import annotations
+import json, math, sqlite3
+import pytest
+
+import storage.embryology_db as edb
+
+def _item(pid, day, **kw):
+    base = dict(patient_id=pid, day=day, date_utc=1_700_000_000 + day, stage="cleavage",
+                total=6, good=4, grades="4BB, 3BA", notes="")
+    base.update(kw)
+    return base
+
+def test_bulk_insert_round_trips_details():
+    details = {"embryos": [{"id": 1, "grade": "4AA"}], "note": "Größe ok"}
+    n = edb.add_updates_bulk([_item("P1", 1), _item("P1", 3, details=details)])
+    assert n == 2
+    rows = edb.list_updates("P1")
+    assert [r["day"] for r in rows] == [1, 3]
+    assert json.loads(rows[0]["details_json"]) == {}
+    assert json.loads(rows[1]["details_json"]) == details
+
+def test_bulk_insert_rolls_back_on_bad_row():
+    edb.add_update("P2", 0, 1_700_000_000, "fertilization", 8, 8, "", "")
+    with pytest.raises(sqlite3.IntegrityError):
+        edb.add_updates_bulk([_item("P2", 1), _item(None, 2), _item("P2", 3)])  # NOT NULL patient_id
+    assert [r["day"] for r in edb.list_updates("P2")] == [0]
+
+def test_details_keep_non_str_keys_and_nan():
+    edb.add_update("P3", 1, 1_700_000_000, "cleavage", 2, 1, "", "", details={1: "4AA", "q": float("nan")})
+    edb.add_updates_bulk([_item("P3", 2, details={2: None})])
+    first, second = (json.loads(r["details_json"]) for r in edb.list_updates("P3"))
+    assert first["1"] == "4AA" and math.isnan(first["q"])
+    assert second == {"2": None}
@@ -4,15 +4,16 @@ from pathlib import Path
 import json
 import types
 import pytest
-from PIL import Image
 
 import agents.extract as ex
 import pipelines.document_detector as dd
 import storage.registry as reg
 
-def _fake_predict_one(img_pil: Image.Image):
-    W, H = img_pil.size
-    return [{"label": "FSH", "conf": 0.88, "bbox": [int(W*0.2), int(H*0.25), int(W*0.6), int(H*0.33)]}]
+def _fake_predict_batch(model, imgs):
+    return [
+        dd._make_dets([[int(W*0.2), int(H*0.25), int(W*0.6), int(H*0.33)]], [0.88], [0], {0: "FSH"})
+        for H, W in (img.shape[:2] for img in imgs)  # HxWx3 RGB arrays
+    ]
 
 def test_run_extraction_with_upsert(monkeypatch, tmp_path, make_dummy_image):
     img_path, _ = make_dummy_image
@@ -20,9 +21,15 @@ def test_run_extraction_with_upsert(monkeypatch, tmp_path, make_dummy_image):
     # --- mock YOLO + OCR ---
     class _FakeModel: pass
     monkeypatch.setattr(dd, "_load_yolo", lambda: _FakeModel())
-    monkeypatch.setattr(dd, "_predict_one", _fake_predict_one)
+    monkeypatch.setattr(dd, "_predict_batch", _fake_predict_batch)
     monkeypatch.setattr(dd, "pytesseract", types.SimpleNamespace(
-        image_to_string=lambda img, config=None: "7.1 IU/L"
+        image_to_string=lambda img, config=None: "7.1 IU/L",
+        # page-level OCR: words inside the fake FSH box (x 160-480, y 150-198)
+        image_to_data=lambda img, config=None, output_type=None: {
+            "text": ["7.1", "IU/L"], "conf": [96, 94],
+            "left": [200, 250], "top": [160, 160], "width": [40, 50], "height": [24, 24],
+            "block_num": [1, 1], "par_num": [1, 1], "line_num": [1, 1],
+        },
     ))
 
     # --- mock Pinecone upsert path (agents.extract detects function signature) ---
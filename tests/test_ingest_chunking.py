@@ -0,0 +1,50 @@
+# tests/test_ingest_chunking.py
+from __future__ import annotations
+import pytest
+
+# needs the app deps it imports at module level (python-dotenv, pinecone)
+ingest = pytest.importorskip("pipelines.ingest_docs")
+
+class _ByteEncoding:
+    """Stand-in BPE: one token per UTF-8 byte, so windows can split characters."""
+    def encode(self, text):
+        return list(text.encode("utf-8"))
+    def decode(self, ids, errors="strict"):
+        return bytes(ids).decode("utf-8", errors=errors)
+
+class _Tiktoken:
+    def __init__(self, by_model=True, by_name=True):
+        self.by_model, self.by_name = by_model, by_name
+    def encoding_for_model(self, name):
+        if not self.by_model:
+            raise KeyError(name)
+        return _ByteEncoding()
+    def get_encoding(self, name):
+        if not self.by_name:
+            raise ValueError(name)
+        return _ByteEncoding()
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    def install(**kw):
+        monkeypatch.setattr(ingest, "tiktoken", _Tiktoken(**kw))
+        ingest._encoder.cache_clear()
+    yield install
+    ingest._encoder.cache_clear()
+
+def test_token_windows_overlap_and_never_emit_replacement_chars(fake_tiktoken):
+    fake_tiktoken()
+    text = "é" * 10  # 2 bytes each
+    chunks = ingest._split_tokens(text, max_tokens=5, overlap=2)
+    assert len(chunks) == 7  # starts at 0, 3, ..., 18 over 20 tokens
+    assert all("�" not in c for c in chunks)
+    assert chunks[0] == "éé"
+
+def test_unknown_model_falls_back_to_cl100k(fake_tiktoken):
+    fake_tiktoken(by_model=False)
+    assert isinstance(ingest._encoder(), _ByteEncoding)
+
+def test_no_encoding_falls_back_to_words(fake_tiktoken):
+    fake_tiktoken(by_model=False, by_name=False)
+    text = " ".join(f"w{i}" for i in range(10))
+    assert ingest._split_tokens(text, max_tokens=4, overlap=1) == ingest._split_words(text, max_words=4, overlap=1)
@@ -0,0 +1,80 @@
+# tests/test_retriever.py
+from __future__ import annotations
+import json, math, os, random
+from pathlib import Path
+import pytest
+
+# needs the app deps it imports at module level (python-dotenv)
+retriever = pytest.importorskip("rag.retriever")
+
+@pytest.fixture(autouse=True)
+def local_stub(monkeypatch):
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+    monkeypatch.setattr(retriever, "_NS_CACHE", {})
+    monkeypatch.setattr(retriever, "STUB_INT8", False)
+    retriever.STUB_DIR.mkdir(parents=True, exist_ok=True)
+
+def _write_ns(namespace, rows) -> Path:
+    path = retriever.STUB_DIR / f"{namespace}.jsonl"
+    path.write_text("".join(json.dumps({"values": v, "metadata": {"i": i}}) + "\n"
+                            for i, v in enumerate(rows)), encoding="utf-8")
+    return path
+
+def _rows(n=60, d=8, seed=7):
+    rnd = random.Random(seed)
+    return [[rnd.uniform(-1, 1) for _ in range(d)] for _ in range(n)]
+
+def _reference(rows, q, k):
+    # the original pure-Python cosine sort
+    def cos(a, b):
+        s = sum(x * y for x, y in zip(a, b))
+        na = math.sqrt(sum(x * x for x in a)); nb = math.sqrt(sum(x * x for x in b))
+        return 0.0 if na == 0 or nb == 0 else s / (na * nb)
+    scored = sorted(((cos(q, v), i) for i, v in enumerate(rows)), reverse=True)
+    return scored[:k]
+
+def test_matches_reference_cosine_sort():
+    rows = _rows()
+    rows[3] = [0.0] * 8  # zero vector scores 0, never NaN
+    _write_ns("kb", rows)
+    q = _rows(n=1, seed=11)[0]
+    hits = retriever.query_pinecone(q, k=10, namespace="kb")
+    ref = _reference(rows, q, 10)
+    assert [h["metadata"]["i"] for h in hits] == [i for _, i in ref]
+    assert [h["score"] for h in hits] == pytest.approx([s for s, _ in ref], abs=1e-5)
+
+def test_int8_top_k_close_to_float(monkeypatch):
+    rows = _rows()
+    _write_ns("kb", rows)
+    q = _rows(n=1, seed=11)[0]
+    monkeypatch.setattr(retriever, "STUB_INT8", True)
+    hits = retriever.query_pinecone(q, k=5, namespace="kb")
+    ref = dict((i, s) for s, i in _reference(rows, q, len(rows)))
+    kth = _reference(rows, q, 5)[-1][0]
+    assert len(hits) == 5
+    for h in hits:  # near-ties may swap, but only for rows within quantization error
+        true = ref[h["metadata"]["i"]]
+        assert h["score"] == pytest.approx(true, abs=2e-2)
+        assert true >= kth - 4e-2
+
+def test_stale_sidecar_falls_back_to_jsonl():
+    path = _write_ns("kb", [[1.0, 0.0], [0.0, 1.0]])
+    retriever.build_sidecar(path)
+    assert retriever.query_pinecone([1.0, 0.0], k=1, namespace="kb")[0]["metadata"]["i"] == 0
+    _write_ns("kb", [[0.0, 1.0], [1.0, 0.0]])  # re-ingested after the sidecar was built
+    later = retriever._sidecar_paths(path)[0].stat().st_mtime + 5
+    os.utime(path, (later, later))
+    assert retriever.query_pinecone([1.0, 0.0], k=1, namespace="kb")[0]["metadata"]["i"] == 1
+
+def test_empty_and_zero_row_namespaces():
+    (retriever.STUB_DIR / "empty.jsonl").write_text("", encoding="utf-8")
+    (retriever.STUB_DIR / "blank.jsonl").write_text("\n\n", encoding="utf-8")
+    assert retriever.query_pinecone([1.0, 0.0], namespace="empty") == []
+    assert retriever.query_pinecone([1.0, 0.0], namespace="blank") == []
+    assert retriever.query_pinecone([1.0, 0.0], namespace="missing") == []
+    assert retriever.build_sidecar(retriever.STUB_DIR / "empty.jsonl")["count"] == 0
+    assert retriever.query_pinecone([1.0, 0.0], namespace="empty") == []
+
+def test_dimension_mismatch_returns_no_matches():
+    _write_ns("kb", [[1.0, 0.0, 0.0]])
+    assert retriever.query_pinecone([1.0, 0.0], namespace="kb") == []
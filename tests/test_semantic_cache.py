@@ -0,0 +1,65 @@
+# tests/test_semantic_cache.py
+from __future__ import annotations
+import math, os
+import pytest
+
+import rag.semantic_cache as sc
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(sc, "_buckets", {})
+    monkeypatch.setattr(sc, "SIM_THRESHOLD", 0.95)
+
+def _at(cos):
+    # unit vector whose cosine with [1, 0] is cos
+    return [cos, math.sqrt(1 - cos * cos)]
+
+KB = sc.make_key(None, "patient_education", "m")
+
+def test_hit_above_threshold_miss_below():
+    sc.store(KB, [1.0, 0.0], "what is ivf", "A", {})
+    assert sc.lookup(KB, _at(0.96), "what's ivf?") == ("A", {})
+    assert sc.lookup(KB, _at(0.94), "what's ivf?") is None
+
+def test_patient_keys_need_the_same_question_text():
+    key = sc.make_key("P1", "patient_education", "m")
+    sc.store(key, [1.0, 0.0], "What is my AMH level?", "AMH 2.1", {})
+    assert sc.lookup(key, [1.0, 0.0], "what is my FSH level?") is None
+    assert sc.lookup(key, _at(0.99), "  what is MY amh level? ") == ("AMH 2.1", {})
+
+def test_manifest_identity_is_part_of_the_key(tmp_path):
+    man = tmp_path / "manifest.json"
+    man.write_text("{}", encoding="utf-8")
+    before = sc.manifest_id({"manifest": str(man)})
+    os.utime(man, ns=(0, os.stat(man).st_mtime_ns + 10**9))  # re-run rewrote it
+    assert sc.manifest_id({"manifest": str(man)}) != before
+    assert sc.manifest_id(None) == ""
+    sc.store(sc.make_key(None, "kb", "m", before), [1.0, 0.0], "q", "A", {})
+    assert sc.lookup(sc.make_key(None, "kb", "m", sc.manifest_id({"manifest": str(man)})), [1.0, 0.0], "q") is None
+
+def test_entries_expire_after_ttl(monkeypatch):
+    sc.store(KB, [1.0, 0.0], "q", "A", {})
+    now = sc.time.time()
+    monkeypatch.setattr(sc.time, "time", lambda: now + sc.TTL_S + 1)
+    assert sc.lookup(KB, [1.0, 0.0], "q") is None
+
+def test_invalidate_by_patient_and_namespace():
+    p1, p2 = sc.make_key("P1", "kb", "m"), sc.make_key("P2", "kb", "m")
+    other = sc.make_key(None, "other", "m")
+    for key in (p1, p2, other):
+        sc.store(key, [1.0, 0.0], "q", "A", {})
+    sc.invalidate(patient_id="P1")
+    assert sc.lookup(p1, [1.0, 0.0], "q") is None and sc.lookup(p2, [1.0, 0.0], "q")
+    sc.invalidate(namespace="kb")
+    assert sc.lookup(p2, [1.0, 0.0], "q") is None and sc.lookup(other, [1.0, 0.0], "q")
+
+def test_error_replies_are_never_cached(monkeypatch):
+    qa = pytest.importorskip("rag.qa")  # needs the app deps it imports (python-dotenv)
+    monkeypatch.setattr(qa, "_embed", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(qa, "query_pinecone", lambda *a, **kw: [])
+    def broken():
+        raise RuntimeError("chat down")
+    monkeypatch.setattr(qa, "_oai", broken)
+    answer, diag = qa.answer_hybrid_with_diagnostics("q", None, None, "kb", "m")
+    assert answer.startswith("OpenAI chat error") and "error" in diag
+    assert sc._buckets == {}
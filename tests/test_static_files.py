@@ -0,0 +1,49 @@
+# tests/test_static_files.py
+from __future__ import annotations
+import os, time
+import pytest
+from PIL import Image
+
+import ui.static_files as sf
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    d = tmp_path / "static"
+    monkeypatch.setattr(sf, "STATIC_DIR", d)
+    monkeypatch.setattr(sf, "ANNOTATION_DIR", d / "annotations")
+    return d
+
+def _page(pid="P123", run="run-20250101-000000", name="page1.png"):
+    p = os.path.abspath(os.path.join("storage", "patients", pid, run, "pages", name))
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    Image.new("RGB", (4, 4)).save(p)
+    return p
+
+def test_annotation_url_hides_patient_and_run(static_dir):
+    url = sf.publish_annotation(_page())
+    assert "P123" not in url and "run-2025" not in url
+    token = url.split("/")[-2]
+    assert len(token) == 24 and (static_dir / "annotations" / token / "page1.png").exists()
+    assert sf.publish_annotation(_page(pid="P124")) != url
+
+def test_flat_run_layouts_get_separate_urls(static_dir):
+    # storage/processed/<run>/page_NN_annotated.jpg: no patient or pages/ level
+    urls = {}
+    for run, color in (("run-a", (255, 0, 0)), ("run-b", (0, 0, 255))):
+        p = os.path.abspath(os.path.join("storage", "processed", run, "page_01_annotated.png"))
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        Image.new("RGB", (4, 4), color).save(p)
+        urls[run] = (sf.publish_annotation(p), p)
+    assert urls["run-a"][0] != urls["run-b"][0]
+    for url, src in urls.values():
+        served = static_dir / "annotations" / url.split("/")[-2] / "page_01_annotated.png"
+        assert served.read_bytes() == open(src, "rb").read()
+
+def test_sweep_removes_only_expired_runs(static_dir):
+    old = sf.publish_annotation(_page(run="run-old")).split("/")[-2]
+    new = sf.publish_annotation(_page(run="run-new")).split("/")[-2]
+    stale = time.time() - sf.ANNOTATION_TTL_S - 60
+    os.utime(static_dir / "annotations" / old, (stale, stale))
+    assert sf.sweep_annotations() == 1
+    assert not (static_dir / "annotations" / old).exists()
+    assert (static_dir / "annotations" / new).exists()
@@ -0,0 +1,49 @@
+# tests/test_storage_pool.py
+from __future__ import annotations
+import gc, sqlite3, threading
+import pytest
+
+import storage._pool as pool
+
+@pytest.fixture
+def migrate_calls(monkeypatch):
+    monkeypatch.setattr(pool, "_MIGRATED", set())
+    calls = []
+    def migrate(c):
+        calls.append(1)
+        c.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+        c.commit()
+    return calls, migrate
+
+def _in_thread(fn):
+    out = []
+    t = threading.Thread(target=lambda: out.append(fn()))
+    t.start(); t.join()
+    return out[0]
+
+def test_same_thread_reuses_connection(migrate_calls):
+    _, migrate = migrate_calls
+    assert pool.get_conn("a.db", migrate) is pool.get_conn("a.db", migrate)
+    assert pool.get_conn("a.db", migrate) is not pool.get_conn("b.db", migrate)
+
+def test_other_thread_gets_own_connection_and_migrate_runs_once(migrate_calls):
+    calls, migrate = migrate_calls
+    mine = pool.get_conn("a.db", migrate)
+    theirs = _in_thread(lambda: pool.get_conn("a.db", migrate))
+    assert theirs is not mine
+    assert len(calls) == 1
+
+def test_dead_thread_connections_are_closed(migrate_calls):
+    _, migrate = migrate_calls
+    theirs = _in_thread(lambda: pool.get_conn("a.db", migrate))
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        theirs.execute("SELECT 1")
+
+def test_ro_handle_rejects_writes(migrate_calls):
+    _, migrate = migrate_calls
+    ro = pool.get_ro_conn("a.db", migrate)
+    assert ro is not pool.get_conn("a.db", migrate)
+    assert ro.execute("SELECT count(*) FROM t").fetchone()[0] == 0
+    with pytest.raises(sqlite3.OperationalError):
+        ro.execute("INSERT INTO t VALUES (1)")
@@ -0,0 +1,35 @@
+# ui/cached.py
+import json, time
+from pathlib import Path
+import streamlit as st
+
+from storage.clinic_db import snapshot
+from storage.embryology_db import list_updates
+from storage.registry import latest_manifest, list_manifests
+
+# Short-lived caches for listings that pages redraw on every rerun/keystroke.
+# Writers call <wrapper>.clear() right after saving so the next render is fresh.
+LIST_TTL_S = 30
+
+@st.cache_data(ttl=LIST_TTL_S, show_spinner=False)
+def cached_list_manifests(patient_id: str, limit: int = 5):
+    return list_manifests(patient_id, limit=limit)
+
+@st.cache_data(ttl=LIST_TTL_S, show_spinner=False)
+def cached_latest_manifest(patient_id: str):
+    return latest_manifest(patient_id)
+
+@st.cache_data(ttl=LIST_TTL_S, show_spinner=False)
+def cached_list_updates(patient_id: str, limit: int = 50):
+    return list_updates(patient_id, limit=limit)
+
+@st.cache_data(ttl=LIST_TTL_S, show_spinner=False)
+def cached_clinic_snapshot(patient_id: str):
+    # appointments + treatments for one patient from a single read transaction;
+    # "now" is taken when the entry is filled, so a just-started visit may linger up to the TTL
+    return snapshot(patient_id, now_utc=int(time.time()), limit=20, history_limit=10)
+
+@st.cache_data(show_spinner=False)
+def cached_read_manifest(path: str, mtime: float) -> dict:
+    # no TTL: mtime is part of the key so a rewritten manifest is re-read
+    return json.loads(Path(path).read_text(encoding="utf-8"))
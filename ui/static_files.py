@@ -0,0 +1,75 @@
+# ui/static_files.py
+import base64, hashlib, hmac, os, secrets, shutil, threading, time
+from pathlib import Path
+from urllib.parse import quote
+
+# Streamlit serves ./static (next to Home.py) under /app/static/ when
+# [server] enableStaticServing = true — see .streamlit/config.toml.
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Annotated pages are PHI and static serving has no auth, so each run folder is
+# published under an unguessable HMAC token of its path (no patient ID in the URL) and
+# removed ANNOTATION_TTL_S after it was last shown. Without APP_SECRET the
+# key is per-process, so URLs simply change after a restart.
+ANNOTATION_DIR = STATIC_DIR / "annotations"
+ANNOTATION_TTL_S = int(os.getenv("ANNOTATION_TTL_S", "3600"))
+_SWEEP_EVERY_S = 300
+_KEY = (os.getenv("APP_SECRET") or "").encode() or secrets.token_bytes(32)
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+def static_url(rel: str | Path) -> str:
+    return "/app/static/" + quote(Path(rel).as_posix())
+
+def publish(src: str | Path, rel: str | Path) -> str:
+    """Copy src to static/<rel> (only when missing or stale) and return its URL."""
+    src = Path(src)
+    dst = STATIC_DIR / rel
+    if not dst.exists() or dst.stat().st_mtime < src.stat().st_mtime:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dst)
+    return static_url(rel)
+
+def _dir_token(src_dir: Path) -> str:
+    # keyed on the full source directory, so every run (in any storage layout)
+    # gets its own folder and one run's pages can never shadow another's
+    mac = hmac.new(_KEY, str(src_dir).encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:18]).decode()  # 144 bits, 24 URL-safe chars
+
+def sweep_annotations(now: float | None = None) -> int:
+    """Delete published runs not shown for ANNOTATION_TTL_S; returns how many were removed."""
+    now = time.time() if now is None else now
+    removed = 0
+    if not ANNOTATION_DIR.is_dir():
+        return 0
+    for d in ANNOTATION_DIR.iterdir():
+        try:
+            if now - d.stat().st_mtime > ANNOTATION_TTL_S:
+                if d.is_dir():
+                    shutil.rmtree(d)
+                else:
+                    d.unlink()
+                removed += 1
+        except OSError:
+            pass  # raced with another session's sweep
+    return removed
+
+def _maybe_sweep() -> None:
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < _SWEEP_EVERY_S or not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        _last_sweep = now
+        sweep_annotations(now)
+    finally:
+        _sweep_lock.release()
+
+def publish_annotation(image_path: str | Path) -> str:
+    """Publish an annotated page under static/annotations/<token>/ and return its URL."""
+    _maybe_sweep()
+    p = Path(image_path).resolve()
+    token = _dir_token(p.parent)
+    url = publish(p, Path("annotations") / token / p.name)
+    os.utime(ANNOTATION_DIR / token)  # shown again: restart its TTL
+    return url
@@ -0,0 +1,12 @@
+# ui/uploads.py
+import shutil
+from pathlib import Path
+
+def save_upload(uploaded, dest: str | Path) -> Path:
+    """Stream a Streamlit UploadedFile to dest in 1 MiB chunks and return the path."""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    uploaded.seek(0)  # a rerun may have read it already
+    with open(dest, "wb") as f:
+        shutil.copyfileobj(uploaded, f, length=1 << 20)
+    return dest